@@ -1,15 +1,54 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from app.clients.http_client import close_http_clients
+from app.clients.llm_client import llm_client_pool
+from app.clients.local_index import local_index
+from app.clients.supabase_client import close_supabase_pool, close_async_supabase_pool
+from app.clients.vector_store import vector_store_registry
+from app.core.config import settings, metadata
+from app.services.job_worker import job_workers
+from app.utils.answer_cache import answer_cache
+from app.utils.embedding_cache import query_embedding_cache, chunk_embedding_store
+from app.utils.job_queue import job_queue
+from app.utils.search_cache import search_cache
+from app.utils.pdf_extract import shutdown_extraction_pool
 from dotenv import load_dotenv
 import traceback
 import uuid
 
-from app.routes import metadata, workflow, documents, sessions, messages
+from app.routes import metadata as metadata_routes, workflow, documents, sessions, messages
 
 
 load_dotenv()
-app = FastAPI(title=settings.APP_NAME)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        vector_store_registry.warmup(metadata.embedding_models)
+    except Exception as e:
+        # Handles are created lazily on first use if warmup fails
+        print("⚠️ Vector store warmup failed:", str(e))
+    await job_workers.start()
+    yield
+    await job_workers.stop()
+    job_queue.close()
+    search_cache.close()
+    answer_cache.close()
+    vector_store_registry.close()
+    llm_client_pool.close()
+    local_index.close()
+    query_embedding_cache.close()
+    chunk_embedding_store.close()
+    shutdown_extraction_pool()
+    close_supabase_pool()
+    await close_async_supabase_pool()
+    await close_http_clients()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,7 +75,7 @@ async def add_request_id_and_handle_exceptions(request: Request, call_next):
         raise e
 
 
-app.include_router(metadata.router, prefix=settings.API_PREFIX, tags=["metadata"])
+app.include_router(metadata_routes.router, prefix=settings.API_PREFIX, tags=["metadata"])
 app.include_router(workflow.router, prefix=settings.API_PREFIX, tags=["workflow"])
 
 app.include_router(documents.router, prefix=settings.API_PREFIX, tags=["documents"])
@@ -0,0 +1,30 @@
+import threading
+from typing import Dict
+
+import httpx
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def async_http_client(name: str, **client_kwargs) -> httpx.AsyncClient:
+    """
+    Named, process-wide httpx.AsyncClient. Created on first use with
+    `client_kwargs` (limits, timeout, ...) and reused so connections stay pooled.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(**client_kwargs)
+                _clients[name] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        await client.aclose()
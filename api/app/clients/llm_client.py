@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple, Any
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.core.config import settings
+
+LLMKey = Tuple[str, float, int]
+
+
+class LLMClientPool:
+    """
+    Long-lived chat model clients keyed by (model, temperature, max_retries).
+
+    Building a ChatGoogleGenerativeAI sets up its HTTP/gRPC channel and
+    credentials, so clients are created on first use and shared afterwards;
+    invoking one concurrently is safe since calls don't mutate the client.
+    Temperature comes from user-editable workflow definitions, so clients are
+    kept in LRU order and bounded by `max_clients`.
+    """
+
+    def __init__(self, max_clients: int = 64):
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[LLMKey, ChatGoogleGenerativeAI]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "evicted": 0, "create_seconds": 0.0, "max_create_seconds": 0.0}
+
+    def get(self, model: str, temperature: float, max_retries: int = 2) -> ChatGoogleGenerativeAI:
+        key = (model, float(temperature), max_retries)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self._stats["reused"] += 1
+                return client
+
+            started = time.perf_counter()
+            client = ChatGoogleGenerativeAI(
+                model=model,
+                api_key=os.getenv("GOOGLE_API_KEY"),
+                temperature=temperature,
+                max_retries=max_retries,
+            )
+            elapsed = time.perf_counter() - started
+            self._stats["created"] += 1
+            self._stats["create_seconds"] += elapsed
+            self._stats["max_create_seconds"] = max(self._stats["max_create_seconds"], elapsed)
+
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self._stats["evicted"] += 1
+            return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"open_clients": len(self._clients), **self._stats}
+
+    def close(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+llm_client_pool = LLMClientPool(max_clients=settings.LLM_CLIENT_POOL_SIZE)
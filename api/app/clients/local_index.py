@@ -0,0 +1,375 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+VECTORS_FILE = "vectors.bin"
+CODES_FILE = "codes.bin"
+SCALES_FILE = "scales.npy"
+IDS_FILE = "ids.npy"
+DOCUMENTS_FILE = "documents.npy"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value)
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _widened_rows(dimension: int) -> int:
+    """Rows per block when codes must be widened to float32: ~4 MB, so the copy stays in cache."""
+    return max(64, (4 << 20) // (4 * max(1, dimension)))
+
+
+def _best(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+    k = min(k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+def _write_codes(directory: str, vectors: np.ndarray, quantization: str, block_rows: int) -> None:
+    """
+    First-pass codes for the full-precision rows. int8 scales each dimension
+    by its largest magnitude; binary keeps one sign bit per dimension.
+    """
+    if quantization == "int8":
+        peak = np.zeros(vectors.shape[1], dtype=np.float32)
+        for start in range(0, len(vectors), block_rows):
+            np.maximum(peak, np.abs(np.asarray(vectors[start:start + block_rows], dtype=np.float32)).max(axis=0), out=peak)
+        scales = np.where(peak > 0, peak / 127, 1.0).astype(np.float32)
+        np.save(os.path.join(directory, SCALES_FILE), scales)
+
+    with open(os.path.join(directory, CODES_FILE), "wb") as f:
+        for start in range(0, len(vectors), block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            if quantization == "int8":
+                codes = np.clip(np.rint(block / scales), -127, 127).astype(np.int8)
+            else:
+                codes = np.packbits(block > 0, axis=1)
+            f.write(codes.tobytes())
+
+
+class WorkflowIndex:
+    """
+    One built version of a workflow's index, memory-mapped read-only.
+
+    Vectors are unit-normalised rows of a contiguous matrix, so the dot
+    product is the cosine similarity. The files are only paged in as they
+    are scanned and the pages are shared with every process mapping them.
+
+    A quantized index also carries int8 or packed sign-bit codes. Searches
+    scan the codes (4x or 32x fewer bytes than float32) for a shortlist of
+    k * rescore_factor rows and rescore only those at full precision.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        self.count = int(self.manifest["count"])
+        self.dimension = int(self.manifest["dimension"])
+        self.vectors = np.memmap(
+            os.path.join(directory, VECTORS_FILE),
+            dtype=self.manifest["dtype"],
+            mode="r",
+            shape=(self.count, self.dimension),
+        ) if self.count else np.empty((0, self.dimension), dtype=self.manifest["dtype"])
+        self.ids = np.load(os.path.join(directory, IDS_FILE), mmap_mode="r")
+        self.document_codes = np.load(os.path.join(directory, DOCUMENTS_FILE), mmap_mode="r")
+        self.documents = {document_id: code for code, document_id in enumerate(self.manifest["document_ids"])}
+
+        self.quantization = self.manifest.get("quantization", "none")
+        self.codes = self.scales = None
+        if self.quantization != "none" and self.count:
+            int8 = self.quantization == "int8"
+            self.codes = np.memmap(
+                os.path.join(directory, CODES_FILE),
+                dtype=np.int8 if int8 else np.uint8,
+                mode="r",
+                shape=(self.count, self.dimension if int8 else (self.dimension + 7) // 8),
+            )
+            if int8:
+                self.scales = np.load(os.path.join(directory, SCALES_FILE))
+
+    @staticmethod
+    def _scan(matrix: np.ndarray, score, rows: Optional[np.ndarray], block_rows: int) -> np.ndarray:
+        total = len(matrix) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, block_rows):
+            end = min(start + block_rows, total)
+            scores[start:end] = score(matrix[start:end] if rows is None else matrix[rows[start:end]])
+        return scores
+
+    def _exact(self, query: np.ndarray, rows: Optional[np.ndarray], block_rows: int) -> np.ndarray:
+        if self.vectors.dtype != np.float32:
+            # float16 has no BLAS path; widen one cache-sized block at a time
+            block_rows = min(block_rows, _widened_rows(self.dimension))
+        return self._scan(self.vectors, lambda block: np.asarray(block, dtype=np.float32) @ query, rows, block_rows)
+
+    def _approximate(self, query: np.ndarray, rows: Optional[np.ndarray], block_rows: int) -> np.ndarray:
+        """First-pass scores from the codes; higher is closer."""
+        if self.quantization == "int8":
+            scaled = query * self.scales
+            return self._scan(
+                self.codes,
+                lambda block: block.astype(np.float32) @ scaled,
+                rows,
+                min(block_rows, _widened_rows(self.dimension)),
+            )
+        bits = np.packbits(query > 0)
+        # Fewer differing sign bits (Hamming distance) means closer
+        return self._scan(
+            self.codes,
+            lambda block: -np.bitwise_count(block ^ bits).sum(axis=1, dtype=np.int32),
+            rows,
+            min(block_rows, 8192),
+        )
+
+    def search(
+            self,
+            query: Sequence[float],
+            k: int,
+            document_ids: Optional[Iterable[str]] = None,
+            block_rows: int = 65536,
+            rescore_factor: int = 10,
+    ) -> List[Tuple[str, float]]:
+        """(chunk id, cosine similarity) of the `k` nearest rows, best first."""
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        rows = None
+        if document_ids is not None:
+            codes = [self.documents[document_id] for document_id in document_ids if document_id in self.documents]
+            rows = np.flatnonzero(np.isin(self.document_codes, codes))
+        total = self.count if rows is None else len(rows)
+        if total == 0 or k <= 0:
+            return []
+
+        shortlist = k * max(1, rescore_factor)
+        if self.codes is None or total <= shortlist:
+            scores = self._exact(query, rows, block_rows)
+            best = _best(scores, k)
+            positions = best if rows is None else rows[best]
+        else:
+            candidates = _best(self._approximate(query, rows, block_rows), shortlist)
+            # Sorted rows keep the full-precision reads sequential within the mapping
+            candidates = np.sort(candidates if rows is None else rows[candidates])
+            scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            best = _best(scores, k)
+            positions = candidates[best]
+
+        return [(self.ids[position].decode(), float(scores[i])) for i, position in zip(best, positions)]
+
+
+class LocalVectorIndex:
+    """
+    Per-workflow vector indexes on local disk, as an alternative to querying
+    Chroma for retrieval. Chroma stays the source of truth: indexes are
+    rebuilt from it after ingestion and hits are resolved back to chunks by ID.
+
+    Layout is <root>/<embedding model>/<workflow>/<version>/ with a CURRENT
+    file naming the live version. A rebuild writes a new version and swaps
+    CURRENT atomically, so readers (in any process) never see a partial
+    index; each process notices the swap on its next lookup and remaps.
+    """
+
+    def __init__(
+            self,
+            root: str,
+            dtype: str = "float32",
+            block_rows: int = 65536,
+            quantization: str = "none",
+            rescore_factor: int = 10,
+    ):
+        self.root = root
+        self.dtype = dtype
+        self.block_rows = block_rows
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._loaded: Dict[Tuple[str, str], Tuple[Tuple[int, int], WorkflowIndex]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"searches": 0, "missing": 0, "loads": 0, "builds": 0, "build_seconds": 0.0}
+
+    def _directory(self, embeddings_model: str, workflow_id: Any) -> str:
+        return os.path.join(self.root, _slug(embeddings_model), _slug(str(workflow_id)))
+
+    def get(self, embeddings_model: str, workflow_id: Any) -> Optional[WorkflowIndex]:
+        """The live index for the workflow, loaded on first use; None if never built."""
+        directory = self._directory(embeddings_model, workflow_id)
+        key = (embeddings_model, str(workflow_id))
+        try:
+            current = os.stat(os.path.join(directory, CURRENT_FILE))
+            marker = (current.st_ino, current.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            loaded = self._loaded.get(key)
+            if loaded is not None and loaded[0] == marker:
+                return loaded[1]
+
+        try:
+            with open(os.path.join(directory, CURRENT_FILE)) as f:
+                index = WorkflowIndex(os.path.join(directory, f.read().strip()))
+        except FileNotFoundError:
+            # Raced with a rebuild cleaning up; the next lookup sees the new version
+            return None
+
+        with self._lock:
+            self._loaded[key] = (marker, index)
+            self._stats["loads"] += 1
+        return index
+
+    def search(
+            self,
+            embeddings_model: str,
+            workflow_id: Any,
+            query: Sequence[float],
+            k: int,
+            document_ids: Optional[Iterable[Any]] = None,
+    ) -> Optional[List[Tuple[str, float]]]:
+        """Nearest chunk IDs, or None when the workflow has no usable index (caller falls back to Chroma)."""
+        index = self.get(embeddings_model, workflow_id)
+        usable = index is not None and index.dimension == len(query)
+        with self._lock:
+            self._stats["searches" if usable else "missing"] += 1
+        if not usable:
+            return None
+        return index.search(
+            query,
+            k,
+            document_ids=[str(document_id) for document_id in document_ids] if document_ids else None,
+            block_rows=self.block_rows,
+            rescore_factor=self.rescore_factor,
+        )
+
+    def write(
+            self,
+            embeddings_model: str,
+            workflow_id: Any,
+            batches: Iterable[Tuple[List[str], Any, List[Optional[str]]]],
+    ) -> Dict[str, Any]:
+        """
+        Build a new version from (ids, vectors, document ids) batches and make
+        it live. Vectors are streamed to disk, so memory stays bounded by one
+        batch plus the IDs.
+        """
+        started = time.perf_counter()
+        directory = self._directory(embeddings_model, workflow_id)
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        target = os.path.join(directory, version)
+        os.makedirs(target)
+
+        ids: List[str] = []
+        document_codes: List[int] = []
+        documents: Dict[str, int] = {}
+        dimension = None
+        try:
+            with open(os.path.join(target, VECTORS_FILE), "wb") as f:
+                for batch_ids, vectors, document_ids in batches:
+                    vectors = np.asarray(vectors, dtype=np.float32)
+                    if not len(batch_ids):
+                        continue
+                    if dimension is None:
+                        dimension = vectors.shape[1]
+                    elif vectors.shape[1] != dimension:
+                        raise ValueError(f"Mixed embedding dimensions in index: {dimension} and {vectors.shape[1]}")
+                    f.write(_unit_rows(vectors).astype(self.dtype).tobytes())
+                    ids.extend(batch_ids)
+                    document_codes.extend(
+                        documents.setdefault(str(document_id), len(documents)) for document_id in document_ids
+                    )
+
+            np.save(os.path.join(target, IDS_FILE), np.array(ids, dtype="S"))
+            np.save(os.path.join(target, DOCUMENTS_FILE), np.array(document_codes, dtype=np.int32))
+            quantization = self.quantization if ids else "none"
+            if quantization != "none":
+                vectors = np.memmap(
+                    os.path.join(target, VECTORS_FILE), dtype=self.dtype, mode="r", shape=(len(ids), dimension)
+                )
+                _write_codes(target, vectors, quantization, self.block_rows)
+                del vectors
+            manifest = {
+                "version": version,
+                "count": len(ids),
+                "dimension": dimension or 0,
+                "dtype": self.dtype,
+                "quantization": quantization,
+                "embedding_model": embeddings_model,
+                "workflow_id": str(workflow_id),
+                "document_ids": list(documents),
+                "built_at": time.time(),
+            }
+            with open(os.path.join(target, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f)
+
+            current = os.path.join(directory, CURRENT_FILE)
+            with open(current + f".{version}", "w") as f:
+                f.write(version)
+            os.replace(current + f".{version}", current)
+        except BaseException:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+
+        # Older versions stay valid for processes still mapping them; unlinking is safe on POSIX
+        for name in os.listdir(directory):
+            if name.startswith("v") and name < version:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["builds"] += 1
+            self._stats["build_seconds"] += elapsed
+        return {**manifest, "seconds": round(elapsed, 3)}
+
+    def drop(self, workflow_id: Any) -> None:
+        """Remove the workflow's indexes for every embedding model."""
+        with self._lock:
+            for key in [key for key in self._loaded if key[1] == str(workflow_id)]:
+                del self._loaded[key]
+        if not os.path.isdir(self.root):
+            return
+        for model_directory in os.listdir(self.root):
+            shutil.rmtree(os.path.join(self.root, model_directory, _slug(str(workflow_id))), ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": settings.VECTOR_INDEX_BACKEND,
+                "loaded": len(self._loaded),
+                "quantization": self.quantization,
+                "mapped_bytes": sum(index.vectors.nbytes for _marker, index in self._loaded.values()),
+                "code_bytes": sum(
+                    index.codes.nbytes for _marker, index in self._loaded.values() if index.codes is not None
+                ),
+                **self._stats,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._loaded.clear()
+
+
+local_index = LocalVectorIndex(
+    settings.LOCAL_INDEX_PATH,
+    dtype=settings.LOCAL_INDEX_DTYPE,
+    block_rows=settings.LOCAL_INDEX_BLOCK_ROWS,
+    quantization=settings.LOCAL_INDEX_QUANTIZATION,
+    rescore_factor=settings.LOCAL_INDEX_RESCORE_FACTOR,
+)
@@ -0,0 +1,208 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional, Iterable, Any, List
+from uuid import UUID
+
+from chromadb.api.shared_system_client import SharedSystemClient
+from langchain_chroma import Chroma
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from app.core.config import settings, metadata
+from app.utils.batch_embedder import BatchEmbedder
+
+
+def is_partitioned() -> bool:
+    return settings.VECTOR_PARTITIONING == "per_workflow"
+
+
+def embedding_space(model: Optional[str], dimension: Optional[int] = None) -> str:
+    """
+    Key for one embedding model at one output size, used wherever vectors are
+    cached or stored. The bare model name is its full size, so existing data
+    keeps its keys; reduced sizes are "<model>@<dimension>".
+    """
+    model = model or settings.DEFAUTL_EMBEDDINGS_MODEL
+    supported = metadata.embedding_dimensions.get(model)
+    if not dimension or (supported and dimension == supported[0]):
+        return model
+    return f"{model}@{dimension}"
+
+
+def parse_embedding_space(space: Optional[str]) -> Tuple[str, Optional[int]]:
+    model, _, dimension = (space or settings.DEFAUTL_EMBEDDINGS_MODEL).partition("@")
+    return model, int(dimension) if dimension else None
+
+
+def workflow_collection_name(workflow_id: UUID | str) -> str:
+    return f"workflow_{workflow_id}"
+
+
+def sized_collection_name(name: str, embeddings_model: Optional[str] = None) -> str:
+    """`name` suffixed with the vector size when `embeddings_model` is a reduced embedding space."""
+    _model, dimension = parse_embedding_space(embeddings_model)
+    # A Chroma collection holds vectors of a single size
+    return f"{name}_{dimension}" if dimension else name
+
+
+def collection_for_workflow(workflow_id: UUID | str, embeddings_model: Optional[str] = None) -> str:
+    """Chroma collection that holds a workflow's chunks under the configured partitioning."""
+    name = workflow_collection_name(workflow_id) if is_partitioned() else settings.CHROMA_COLLECTION
+    return sized_collection_name(name, embeddings_model)
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+class ReducedEmbeddings(GoogleGenerativeAIEmbeddings):
+    """
+    Embeddings truncated to `output_dimensionality`. Only the full-size output
+    comes back normalised, so vectors are rescaled to unit length here to keep
+    L2 and cosine rankings in agreement.
+    """
+
+    def embed_documents(self, texts: List[str], **kwargs: Any) -> List[List[float]]:
+        return [_unit(vector) for vector in super().embed_documents(texts, **kwargs)]
+
+    def embed_query(self, text: str, **kwargs: Any) -> List[float]:
+        return _unit(super().embed_query(text, **kwargs))
+
+
+class VectorStoreRegistry:
+    """
+    Long-lived embedding clients and Chroma handles, shared by ingestion and
+    retrieval. Embeddings are keyed by model, stores by (model, collection).
+    Store handles are kept in LRU order so per-workflow collections stay bounded.
+    """
+
+    def __init__(self, persist_directory: str, max_stores: int = 1024):
+        self.persist_directory = persist_directory
+        self.max_stores = max_stores
+        self._embeddings: Dict[str, GoogleGenerativeAIEmbeddings] = {}
+        self._stores: "OrderedDict[Tuple[str, str], Chroma]" = OrderedDict()
+        self._batch_embedders: Dict[str, BatchEmbedder] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "embeddings": {"created": 0, "reused": 0, "create_seconds": 0.0, "max_create_seconds": 0.0},
+            "stores": {"created": 0, "reused": 0, "evicted": 0, "create_seconds": 0.0, "max_create_seconds": 0.0},
+        }
+
+    def _record(self, kind: str, created: bool, elapsed: float = 0.0) -> None:
+        stats = self._stats[kind]
+        if not created:
+            stats["reused"] += 1
+            return
+        stats["created"] += 1
+        stats["create_seconds"] += elapsed
+        stats["max_create_seconds"] = max(stats["max_create_seconds"], elapsed)
+
+    def embeddings(self, model: Optional[str] = None) -> GoogleGenerativeAIEmbeddings:
+        """Client for an embedding space (see `embedding_space`)."""
+        model = model or settings.DEFAUTL_EMBEDDINGS_MODEL
+        with self._lock:
+            embeddings = self._embeddings.get(model)
+            if embeddings is not None:
+                self._record("embeddings", created=False)
+                return embeddings
+
+            started = time.perf_counter()
+            base_model, dimension = parse_embedding_space(model)
+            if dimension:
+                embeddings = ReducedEmbeddings(model=base_model, output_dimensionality=dimension)
+            else:
+                embeddings = GoogleGenerativeAIEmbeddings(model=model)
+            self._record("embeddings", created=True, elapsed=time.perf_counter() - started)
+            self._embeddings[model] = embeddings
+            return embeddings
+
+    def store(self, embeddings_model: Optional[str] = None, collection_name: Optional[str] = None) -> Chroma:
+        embeddings_model = embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL
+        collection_name = collection_name or settings.CHROMA_COLLECTION
+        key = (embeddings_model, collection_name)
+
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+                self._record("stores", created=False)
+                return store
+
+        embeddings = self.embeddings(embeddings_model)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+                self._record("stores", created=False)
+                return store
+
+            started = time.perf_counter()
+            base_model, dimension = parse_embedding_space(embeddings_model)
+            store = Chroma(
+                collection_name=collection_name,
+                embedding_function=embeddings,
+                persist_directory=self.persist_directory,
+                # Recorded when a reduced-size collection is created; full-size ones predate this
+                collection_metadata={"embedding_model": base_model, "embedding_dimension": dimension} if dimension else None,
+            )
+            self._record("stores", created=True, elapsed=time.perf_counter() - started)
+            self._stores[key] = store
+            while len(self._stores) > self.max_stores:
+                self._stores.popitem(last=False)
+                self._stats["stores"]["evicted"] += 1
+            return store
+
+    def batch_embedder(self, model: Optional[str] = None) -> BatchEmbedder:
+        """Ingestion embedder for `model`, tuned from Settings.EMBEDDING_* and EMBEDDING_TUNING."""
+        model = model or settings.DEFAUTL_EMBEDDINGS_MODEL
+        embedder = self._batch_embedders.get(model)
+        if embedder is not None:
+            return embedder
+
+        embeddings = self.embeddings(model)
+        with self._lock:
+            embedder = self._batch_embedders.get(model)
+            if embedder is None:
+                tuning = settings.EMBEDDING_TUNING.get(parse_embedding_space(model)[0], {})
+                embedder = BatchEmbedder(
+                    model=model,
+                    embed_fn=embeddings.embed_documents,
+                    batch_size=int(tuning.get("batch_size", settings.EMBEDDING_BATCH_SIZE)),
+                    max_in_flight=int(tuning.get("max_in_flight", settings.EMBEDDING_MAX_IN_FLIGHT)),
+                    requests_per_minute=tuning.get("requests_per_minute", settings.EMBEDDING_REQUESTS_PER_MINUTE),
+                    max_retries=int(tuning.get("max_retries", settings.EMBEDDING_MAX_RETRIES)),
+                    backoff_base=tuning.get("backoff_base", settings.EMBEDDING_BACKOFF_BASE),
+                    backoff_max=tuning.get("backoff_max", settings.EMBEDDING_BACKOFF_MAX),
+                )
+                self._batch_embedders[model] = embedder
+            return embedder
+
+    def workflow_store(self, embeddings_model: Optional[str], workflow_id: UUID | str) -> Chroma:
+        return self.store(embeddings_model, collection_for_workflow(workflow_id, embeddings_model))
+
+    def warmup(self, embedding_models: Iterable[str]) -> None:
+        for model in embedding_models:
+            self.store(model)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_embeddings": len(self._embeddings),
+                "open_stores": len(self._stores),
+                **{kind: dict(values) for kind, values in self._stats.items()},
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for embedder in self._batch_embedders.values():
+                embedder.close()
+            self._batch_embedders.clear()
+            self._stores.clear()
+            self._embeddings.clear()
+        # Stops the persistent Chroma systems (SQLite handles, background threads)
+        SharedSystemClient.clear_system_cache()
+
+
+vector_store_registry = VectorStoreRegistry(settings.CHROMA_PATH, max_stores=settings.VECTOR_STORE_MAX_HANDLES)
@@ -1,3 +1,5 @@
+from typing import Literal, Optional, Dict
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 import os
@@ -17,13 +19,121 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = Field(default=os.getenv("SUPABASE_ANON_KEY", ""))
     # SUPABASE_SERVICE_KEY: str = None
 
+    # Shared HTTP connection pool used by every Supabase client in the process
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_HTTP_TIMEOUT: float = 10.0
+    SUPABASE_HTTP2: bool = False
+    SUPABASE_CONNECT_RETRIES: int = 1
+    # Bearer tokens checked with Supabase Auth are trusted for this many seconds (never past their exp)
+    SUPABASE_TOKEN_CACHE_TTL: float = 60.0
+    SUPABASE_TOKEN_CACHE_SIZE: int = 10000
+
     CHROMA_PATH: str = Field(default="chroma")
+    CHROMA_COLLECTION: str = "workflow_collection"
+    # "shared": one collection filtered by workflow_id, "per_workflow": one collection per workflow
+    VECTOR_PARTITIONING: Literal["shared", "per_workflow"] = "shared"
+    VECTOR_STORE_MAX_HANDLES: int = 1024
+    # Retrieval search: "chroma" queries Chroma directly, "local" uses memory-mapped per-workflow
+    # indexes rebuilt from Chroma after ingestion (falling back to Chroma while one is missing)
+    VECTOR_INDEX_BACKEND: Literal["chroma", "local"] = "chroma"
+    LOCAL_INDEX_PATH: str = "chroma/local_index"
+    LOCAL_INDEX_DTYPE: Literal["float32", "float16"] = "float32"
+    LOCAL_INDEX_BLOCK_ROWS: int = 65536
+    # First-pass codes for the local index ("int8" scalar or "binary" sign bits); a shortlist of
+    # top_k * LOCAL_INDEX_RESCORE_FACTOR rows is then rescored at full precision. Applies from the next rebuild.
+    LOCAL_INDEX_QUANTIZATION: Literal["none", "int8", "binary"] = "none"
+    LOCAL_INDEX_RESCORE_FACTOR: int = 10
+    # Chat model clients kept alive, one per (model, temperature, max_retries)
+    LLM_CLIENT_POOL_SIZE: int = 64
+
+    # Query embeddings: in-memory LRU plus an optional SQLite tier (disabled when path is unset)
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    QUERY_EMBEDDING_CACHE_PATH: Optional[str] = None
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Ingestion embedding: batch size, batches in flight, request rate and 429 backoff.
+    # EMBEDDING_TUNING overrides any of these per model, e.g.
+    # {"models/gemini-embedding-001": {"batch_size": 50, "requests_per_minute": 100}}
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_MAX_IN_FLIGHT: int = 4
+    EMBEDDING_REQUESTS_PER_MINUTE: float = 1500
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_BACKOFF_BASE: float = 1.0
+    EMBEDDING_BACKOFF_MAX: float = 30.0
+    EMBEDDING_TUNING: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+
+    # Streaming ingestion: chunks per embed/upsert batch, batches buffered between parsing and embedding
+    INGEST_BATCH_CHUNKS: int = 400
+    INGEST_QUEUE_BATCHES: int = 2
+    # Documents of one workflow ingested at the same time
+    INGEST_MAX_CONCURRENT_DOCUMENTS: int = 3
+    # PDF text extraction processes (0 = parse in-process) and pages handed to each task
+    PDF_EXTRACT_WORKERS: int = 0
+    PDF_PAGES_PER_TASK: int = 8
+
+    # Content-addressed document chunk vectors, reused across uploads and workflows
+    CHUNK_EMBEDDING_STORE_PATH: str = os.path.join("chroma", "chunk_embeddings.db")
+    # Durable workflow execution queue: worker count, attempts, lease length and retry backoff (seconds)
+    JOB_QUEUE_PATH: str = os.path.join("chroma", "jobs.db")
+    JOB_WORKERS: int = 2
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_VISIBILITY_TIMEOUT: float = 300.0
+    JOB_HEARTBEAT_INTERVAL: float = 60.0
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_RETRY_BACKOFF: float = 10.0
     TEMP_DIR: str = Field(default="temp")
+    # Document downloads: pooled async client, files up to DOWNLOAD_SPOOL_MAX_BYTES never touch disk
+    DOWNLOAD_TIMEOUT: float = 60.0
+    DOWNLOAD_CONNECT_TIMEOUT: float = 10.0
+    DOWNLOAD_POOL_MAX_CONNECTIONS: int = 20
+    DOWNLOAD_POOL_MAX_KEEPALIVE: int = 10
+    DOWNLOAD_CHUNK_BYTES: int = 64 * 1024
+    DOWNLOAD_SPOOL_MAX_BYTES: int = 8 * 1024 * 1024
+    DOWNLOAD_MAX_BYTES: int = 512 * 1024 * 1024
     DEFAUTL_EMBEDDINGS_MODEL:str = "models/gemini-embedding-001"
+    # Streaming replies: minimum seconds between partial answer writes to the placeholder message
+    STREAM_PARTIAL_WRITE_INTERVAL: float = 0.5
+    # Context sources are fetched concurrently; one that exceeds its timeout (seconds) is left out
+    RAG_RETRIEVAL_TIMEOUT: float = 10.0
+    WEB_SEARCH_TIMEOUT: float = 8.0
+    # Estimated tokens of retrieved + web context per prompt; CONTEXT_TOKEN_BUDGETS overrides per LLM model
+    CONTEXT_TOKEN_BUDGET: int = 8000
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = Field(default_factory=dict)
+    # Compiled prompt templates kept, one per (base prompt, workflow prompt, search flag)
+    PROMPT_TEMPLATE_CACHE_SIZE: int = 1024
+    # SerpAPI search locale, and the result cache (seconds to live, in-memory entries, optional SQLite tier)
+    WEB_SEARCH_LOCATION: str = "India"
+    WEB_SEARCH_HL: str = "en"
+    WEB_SEARCH_GL: str = "in"
+    WEB_SEARCH_CACHE_TTL: float = 900.0
+    WEB_SEARCH_CACHE_SIZE: int = 1024
+    WEB_SEARCH_CACHE_PATH: Optional[str] = None
+    # Async SerpAPI client; point SERPAPI_URL at benchmarks/fake_serpapi.py to test offline
+    SERPAPI_URL: str = "https://serpapi.com/search.json"
+    SERPAPI_CONNECT_TIMEOUT: float = 3.0
+    SERPAPI_READ_TIMEOUT: float = 8.0
+    SERPAPI_POOL_MAX_CONNECTIONS: int = 20
+    # Opt-in semantic answer cache: cosine similarity needed for a hit, seconds to live,
+    # answers per (workflow, prompt/model config), and (workflow, config) buckets kept
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL: float = 3600.0
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_MAX_BUCKETS: int = 1024
+    # Per-workflow answer-cache versions, shared by every API and job-worker process on the host
+    # so an invalidation in one process retires answers cached in all of them
+    ANSWER_CACHE_VERSIONS_PATH: str = os.path.join("chroma", "answer_cache_versions.db")
+    # Status push channel: events buffered per subscriber, topics whose last event is kept, SSE keep-alive seconds
+    STATUS_HUB_QUEUE_SIZE: int = 100
+    STATUS_HUB_MAX_RETAINED: int = 10_000
+    STATUS_STREAM_KEEPALIVE: float = 15.0
 
 
 class metadata:
     embedding_models = ["models/gemini-embedding-001"]
+    # Output sizes each embedding model supports, full size first
+    embedding_dimensions = {"models/gemini-embedding-001": [3072, 1536, 768]}
     llm_models = [
         "gemini-2.5-flash-lite",
         "gemini-2.5-flash",
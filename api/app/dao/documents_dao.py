@@ -1,31 +1,68 @@
-from supabase import Client
+from supabase import Client, AsyncClient
 from typing import List, Dict, Any
 from uuid import UUID
 
 
+def _new_document_data(workflow_id: UUID, file_name: str, file_url: str) -> Dict[str, Any]:
+    return {
+        "workflow_id": str(workflow_id),
+        "file_name": file_name,
+        "file_url": file_url,
+        "status": "pending"
+    }
+
+
+def _documents_by_workflow(client: Client | AsyncClient, workflow_id: UUID):
+    return client.table("documents").select("*").eq("workflow_id", str(workflow_id))
+
+
+def _document_by_id(client: Client | AsyncClient, document_id: UUID):
+    return client.table("documents").select("*").eq("id", str(document_id)).single()
+
+
+def _document_status_update(client: Client | AsyncClient, document_id: UUID, status: str):
+    return client.table("documents").update({"status": status}).eq("id", str(document_id))
+
+
 class DocumentsDAO:
     def __init__(self, client: Client):
         self.client = client
 
     def create_document(self, workflow_id: UUID, file_name: str, file_url: str) -> Dict[str, Any]:
-        data = {
-            "workflow_id": str(workflow_id),
-            "file_name": file_name,
-            "file_url": file_url,
-            "status": "pending"
-        }
+        data = _new_document_data(workflow_id, file_name, file_url)
         response = self.client.table("documents").insert(data).execute()
         return response.data[0]
 
     def list_documents_by_workflow(self, workflow_id: UUID) -> List[Dict[str, Any]]:
-        response = self.client.table("documents").select("*").eq("workflow_id", str(workflow_id)).execute()
+        response = _documents_by_workflow(self.client, workflow_id).execute()
         return response.data
 
     def get_document(self, document_id: UUID) -> Dict[str, Any]:
-        response = self.client.table("documents").select("*").eq("id", str(document_id)).single().execute()
+        response = _document_by_id(self.client, document_id).execute()
         return response.data
 
     def update_document_status(self, document_id: UUID, status: str) -> Dict[str, Any]:
-        data = {"status": status}
-        response = self.client.table("documents").update(data).eq("id", str(document_id)).execute()
+        response = _document_status_update(self.client, document_id, status).execute()
+        return response.data[0]
+
+
+class AsyncDocumentsDAO:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def create_document(self, workflow_id: UUID, file_name: str, file_url: str) -> Dict[str, Any]:
+        data = _new_document_data(workflow_id, file_name, file_url)
+        response = await self.client.table("documents").insert(data).execute()
+        return response.data[0]
+
+    async def list_documents_by_workflow(self, workflow_id: UUID) -> List[Dict[str, Any]]:
+        response = await _documents_by_workflow(self.client, workflow_id).execute()
+        return response.data
+
+    async def get_document(self, document_id: UUID) -> Dict[str, Any]:
+        response = await _document_by_id(self.client, document_id).execute()
+        return response.data
+
+    async def update_document_status(self, document_id: UUID, status: str) -> Dict[str, Any]:
+        response = await _document_status_update(self.client, document_id, status).execute()
         return response.data[0]
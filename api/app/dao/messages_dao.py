@@ -1,22 +1,59 @@
-from supabase import Client
+from supabase import Client, AsyncClient
 from typing import List, Dict, Any, Optional
 from uuid import UUID
 import json
 
 
+def _messages_by_session(client: Client | AsyncClient, session_id: UUID):
+    return (
+        client.table("chat_messages")
+        .select("*")
+        .eq("session_id", str(session_id))
+        .order("created_at")
+    )
+
+
+def _new_message_data(
+        session_id: UUID,
+        role: str,
+        message: Optional[str],
+        serialized_metadata: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    data = {
+        "session_id": str(session_id),
+        "role": role,
+        "metadata": serialized_metadata,
+    }
+
+    if message not in ["", None]:
+        data["message"] = message
+
+    return data
+
+
+def _message_update(client: Client | AsyncClient, message_id: UUID, update_data: Dict[str, Any]):
+    return (
+        client.table("chat_messages")
+        .update(update_data)
+        .eq("id", str(message_id))
+    )
+
+
+def _message_delete(client: Client | AsyncClient, message_id: UUID):
+    return (
+        client.table("chat_messages")
+        .delete()
+        .eq("id", str(message_id))
+    )
+
+
 class MessagesDAO:
     def __init__(self, client: Client):
         self.client = client
 
     def list_messages_by_session(self, session_id: UUID) -> List[Dict[str, Any]]:
         """List all messages for a given session."""
-        response = (
-            self.client.table("chat_messages")
-            .select("*")
-            .eq("session_id", str(session_id))
-            .order("created_at")
-            .execute()
-        )
+        response = _messages_by_session(self.client, session_id).execute()
         return response.data
 
     def insert_message(
@@ -31,14 +68,8 @@ class MessagesDAO:
         # Serialize metadata to ensure JSON compatibility
         serialized_metadata = self._serialize_metadata(metadata)
 
-        data = {
-            "session_id": str(session_id),
-            "role": role,
-            "metadata": serialized_metadata,
-        }
-
-        if message not in ["", None]:
-            data["message"] = message
+        data = _new_message_data(session_id, role, message, serialized_metadata)
+        if "message" in data:
             print(f"\n\nInserting message: {data}\n")
 
         response = self.client.table("chat_messages").insert(data).execute()
@@ -62,12 +93,7 @@ class MessagesDAO:
 
         print(f"\n\nUpdating message {message_id} with data: {update_data}\n")
 
-        response = (
-            self.client.table("chat_messages")
-            .update(update_data)
-            .eq("id", str(message_id))
-            .execute()
-        )
+        response = _message_update(self.client, message_id, update_data).execute()
 
         if not response.data:
             raise ValueError(f"No message found with id {message_id}")
@@ -77,12 +103,7 @@ class MessagesDAO:
 
     def delete_message(self, message_id: UUID) -> List[Dict[str, Any]]:
         """Delete a message by ID."""
-        response = (
-            self.client.table("chat_messages")
-            .delete()
-            .eq("id", str(message_id))
-            .execute()
-        )
+        response = _message_delete(self.client, message_id).execute()
         return response.data
 
     def _serialize_metadata(self, metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -147,3 +168,52 @@ class MessagesDAO:
         except Exception:
             return repr(value)
 
+
+class AsyncMessagesDAO:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    # Same JSON-safe metadata handling as the sync DAO
+    _serialize_metadata = MessagesDAO._serialize_metadata
+    _serialize_value = MessagesDAO._serialize_value
+
+    async def list_messages_by_session(self, session_id: UUID) -> List[Dict[str, Any]]:
+        """List all messages for a given session."""
+        response = await _messages_by_session(self.client, session_id).execute()
+        return response.data
+
+    async def insert_message(
+            self,
+            session_id: UUID,
+            role: str,
+            message: Optional[str] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Insert a new message with proper metadata serialization."""
+        data = _new_message_data(session_id, role, message, self._serialize_metadata(metadata))
+        response = await self.client.table("chat_messages").insert(data).execute()
+        return response.data[0]
+
+    async def update_message(
+            self,
+            message_id: UUID,
+            message: str,
+            metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Update a message with proper metadata serialization."""
+        update_data = {
+            "message": message,
+            "metadata": self._serialize_metadata(metadata)
+        }
+
+        response = await _message_update(self.client, message_id, update_data).execute()
+
+        if not response.data:
+            raise ValueError(f"No message found with id {message_id}")
+
+        return response.data[0]
+
+    async def delete_message(self, message_id: UUID) -> List[Dict[str, Any]]:
+        """Delete a message by ID."""
+        response = await _message_delete(self.client, message_id).execute()
+        return response.data
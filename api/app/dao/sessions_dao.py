@@ -1,35 +1,63 @@
-from supabase import Client
+from supabase import Client, AsyncClient
 from typing import List, Dict, Any
 from uuid import UUID
 
 
+def _new_session_data(workflow_id: UUID, name: str) -> Dict[str, Any]:
+    return {"workflow_id": str(workflow_id), "title": name}
+
+
+def _sessions_by_workflow(client: Client | AsyncClient, workflow_id: UUID):
+    return (
+        client.table("chat_sessions")
+        .select("*")
+        .eq("workflow_id", str(workflow_id))
+        .order("created_at", desc=True)
+    )
+
+
+def _session_by_id(client: Client | AsyncClient, session_id: UUID):
+    return (
+        client.table("chat_sessions")
+        .select("*")
+        .eq("id", str(session_id))
+        .single()
+    )
+
+
 class SessionsDAO:
     def __init__(self, client: Client):
         self.client = client
 
     def create_session(self, workflow_id: UUID, name: str):
-        data = {"workflow_id": str(workflow_id), "title": name}
+        data = _new_session_data(workflow_id, name)
         response = self.client.table("chat_sessions").insert(data).execute()
         # print(f"Created session {response.data[0]['id']}\n\n\n\n\n")
         return response.data[0]
 
     def list_sessions_by_workflow(self, workflow_id: UUID) -> List[Dict[str, Any]]:
-        response = (
-            self.client.table("chat_sessions")
-            .select("*")
-            .eq("workflow_id", str(workflow_id))
-            .order("created_at", desc=True)
-            .execute()
-        )
+        response = _sessions_by_workflow(self.client, workflow_id).execute()
         # print("\n\n\n\n\n\n LIST WORKFLOW",response)
         return response.data
 
     def get_session(self, session_id: UUID) -> Dict[str, Any]:
-        response = (
-            self.client.table("chat_sessions")
-            .select("*")
-            .eq("id", str(session_id))
-            .single()
-            .execute()
-        )
+        response = _session_by_id(self.client, session_id).execute()
+        return response.data
+
+
+class AsyncSessionsDAO:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def create_session(self, workflow_id: UUID, name: str):
+        data = _new_session_data(workflow_id, name)
+        response = await self.client.table("chat_sessions").insert(data).execute()
+        return response.data[0]
+
+    async def list_sessions_by_workflow(self, workflow_id: UUID) -> List[Dict[str, Any]]:
+        response = await _sessions_by_workflow(self.client, workflow_id).execute()
+        return response.data
+
+    async def get_session(self, session_id: UUID) -> Dict[str, Any]:
+        response = await _session_by_id(self.client, session_id).execute()
         return response.data
@@ -2,11 +2,40 @@ from typing import Optional, Dict, Any
 from uuid import UUID
 
 from pydantic import BaseModel
-from supabase import Client
+from supabase import Client, AsyncClient
 
 from app.schemas.workflow import Definition, WorkflowOut
 
 
+def _new_workflow_data(name: str, description: Optional[str]) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "description": description,
+        "definition": {
+            "temperature": 0.7,
+            "prompt": "You are a helpful PDF assistant. Use web search if the PDF lacks context",
+        },
+    }
+
+
+def _workflow_update_data(
+    name: Optional[str],
+    description: Optional[str],
+    definition: Optional[Definition],
+    status: Optional[str],
+) -> Dict[str, Any]:
+    data = {}
+    if name is not None:
+        data["name"] = name
+    if description is not None:
+        data["description"] = description
+    if isinstance(definition, BaseModel):
+        data["definition"] = definition.model_dump()
+    if status is not None:
+        data["status"] = status
+    return data
+
+
 class WorkflowsDao:
     def __init__(self, client: Client):
         self.client = client
@@ -20,14 +49,7 @@ class WorkflowsDao:
         return response.data
 
     def create_workflow(self, name:str, description:Optional[str]) -> Dict[str, Any]:
-        data = {
-            "name": name,
-            "description": description,
-            "definition": {
-                "temperature": 0.7,
-                "prompt": "You are a helpful PDF assistant. Use web search if the PDF lacks context",
-            },
-        }
+        data = _new_workflow_data(name, description)
         response = self.client.table("workflows").insert(data).execute()
         return response.data[0]
 
@@ -39,15 +61,7 @@ class WorkflowsDao:
         definition: Optional[Definition] = None,
         status: Optional[str] = None,
     ) -> Dict[str, Any]:
-        data = {}
-        if name is not None:
-            data["name"] = name
-        if description is not None:
-            data["description"] = description
-        if isinstance(definition, BaseModel):
-            data["definition"] = definition.model_dump()
-        if status is not None:
-            data["status"] = status
+        data = _workflow_update_data(name, description, definition, status)
 
         # print(f"\n\n\nUpdating workflow {workflow_id} with data: {data}")
         response = (
@@ -64,3 +78,46 @@ class WorkflowsDao:
             self.client.table("workflows").delete().eq("id", str(workflow_id)).execute()
         )
         return len(response.data) > 0
+
+
+
+class AsyncWorkflowsDao:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def list_workflows(self):
+        response = await self.client.table('workflows').select("*").execute()
+        return response.data
+
+    async def get_workflow(self, workflow_id: UUID) -> WorkflowOut | None:
+        response = await self.client.table("workflows").select("*").eq("id",str(workflow_id)).limit(1).maybe_single().execute()
+        # maybe_single() yields None instead of an empty response when nothing matches
+        return response.data if response else None
+
+    async def create_workflow(self, name:str, description:Optional[str]) -> Dict[str, Any]:
+        data = _new_workflow_data(name, description)
+        response = await self.client.table("workflows").insert(data).execute()
+        return response.data[0]
+
+    async def update_workflow(
+        self,
+        workflow_id: UUID,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        definition: Optional[Definition] = None,
+        status: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        data = _workflow_update_data(name, description, definition, status)
+        response = await (
+            self.client.table("workflows")
+            .update(data)
+            .eq("id", str(workflow_id))
+            .execute()
+        )
+        return response.data[0]
+
+    async def delete_workflow(self, workflow_id: UUID) -> bool:
+        response = await (
+            self.client.table("workflows").delete().eq("id", str(workflow_id)).execute()
+        )
+        return len(response.data) > 0
@@ -1,7 +1,13 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import Client
-from app.clients.supabase_client import supabase_service_client, supabase_user_client
+from supabase import Client, AsyncClient
+from app.clients.supabase_client import (
+    supabase_service_client,
+    supabase_user_client,
+    supabase_async_user_client,
+    verify_access_token,
+    averify_access_token,
+)
 from typing import Annotated
 
 security = HTTPBearer()
@@ -18,13 +24,26 @@ def get_bearer_token(credentials: HTTPAuthorizationCredentials = Depends(securit
 
 def supabase_dependency(token: str = Depends(get_bearer_token)) -> Client:
     try:
+        # The pooled clients only forward the JWT, so check it here once rather than fail deep in a DAO
+        verify_access_token(token)
         client = supabase_user_client(token)
         return client
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
-        )
+        ) from e
+
+
+async def async_supabase_dependency(token: str = Depends(get_bearer_token)) -> AsyncClient:
+    try:
+        await averify_access_token(token)
+        return await supabase_async_user_client(token)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        ) from e
 
 
 def get_supabase_service() -> Client:
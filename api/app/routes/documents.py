@@ -1,9 +1,9 @@
 from uuid import UUID
 
 from fastapi import Depends, APIRouter
-from supabase import Client
+from supabase import AsyncClient
 
-from app.routes.deps import supabase_dependency
+from app.routes.deps import async_supabase_dependency
 from app.schemas.document import DocumentOut
 
 from app.services.documet_service import DocumentService
@@ -12,8 +12,8 @@ router = APIRouter(prefix="/documents", tags=["documents"])
 
 
 @router.get("/{document_id}",response_model=DocumentOut)
-async def get_document(document_id: UUID,client: Client = Depends(supabase_dependency)):
+async def get_document(document_id: UUID,client: AsyncClient = Depends(async_supabase_dependency)):
     service = DocumentService(client)
-    document = service.get_document(document_id)
+    document = await service.get_document(document_id)
     return document
 
@@ -1,29 +1,31 @@
-from fastapi import APIRouter, Depends
-from supabase import Client
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from supabase import AsyncClient
 from uuid import UUID
 
-from app.routes.deps import supabase_dependency
+from app.routes.deps import async_supabase_dependency
 from app.services.chat_service import ChatService
 from app.schemas.chat import ChatMessageCreate, ChatMessageOut
 from app.schemas.chat import ChatSessionCreate
+from app.utils.sse import sse_stream, SSE_HEADERS
 import asyncio
 
 router = APIRouter()
 
 
 @router.get("/sessions/{session_id}/messages")
-async def list_messages(session_id: UUID, client: Client = Depends(supabase_dependency)):
+async def list_messages(session_id: UUID, client: AsyncClient = Depends(async_supabase_dependency)):
     service = ChatService(client)
-    return service.list_messages(session_id)
+    return await service.list_messages(session_id)
 
 
 @router.post("/messages")
 async def create_message(
-    payload: ChatMessageCreate, client: Client = Depends(supabase_dependency)
+    payload: ChatMessageCreate, client: AsyncClient = Depends(async_supabase_dependency)
 ):
     service = ChatService(client)
     if payload.metadata and payload.metadata.workflow_id and payload.metadata.is_first:
-        new_session = service.create_session(
+        new_session = await service.create_session(
             payload=ChatSessionCreate(
                 workflow_id=payload.metadata.workflow_id, name=payload.message
             )
@@ -39,7 +41,26 @@ async def create_message(
 async def create_message_with_session(
     session_id: UUID,
     payload: ChatMessageCreate,
-    client: Client = Depends(supabase_dependency),
+    client: AsyncClient = Depends(async_supabase_dependency),
 ):
     service = ChatService(client)
     return await service.process_chat_message(session_id, payload)
+
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def stream_message_with_session(
+    session_id: UUID,
+    payload: ChatMessageCreate,
+    client: AsyncClient = Depends(async_supabase_dependency),
+):
+    """Same as POST /sessions/{session_id}/messages, with the reply streamed as Server-Sent Events."""
+    service = ChatService(client)
+    try:
+        events = await service.stream_chat_message(session_id, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
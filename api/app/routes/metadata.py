@@ -1,12 +1,76 @@
 from supabase import Client
 from fastapi import APIRouter
+from app.clients.llm_client import llm_client_pool
+from app.clients.local_index import local_index
+from app.clients.vector_store import vector_store_registry
+from app.utils.answer_cache import answer_cache
 from app.core.config import metadata
+from app.utils.embedding_cache import query_embedding_cache, chunk_embedding_store
+from app.utils.job_queue import job_queue
+from app.utils.prompt_templates import prompt_templates
+from app.utils.pubsub import status_hub
+from app.utils.search_cache import search_cache
 router = APIRouter()
 
 
 @router.get("/metadata/available-embedding-models")
 async def available_embedding_models():
     return metadata.embedding_models
+
+
+@router.get("/metadata/available-embedding-dimensions")
+async def available_embedding_dimensions():
+    return metadata.embedding_dimensions
 @router.get("/metadata/available-llm-models")
 async def available_llm_models():
     return metadata.llm_models
+
+
+@router.get("/metadata/vector-store-stats")
+async def vector_store_stats():
+    return vector_store_registry.stats()
+
+
+@router.get("/metadata/llm-client-stats")
+async def llm_client_stats():
+    return llm_client_pool.stats()
+
+
+@router.get("/metadata/local-index-stats")
+async def local_index_stats():
+    return local_index.stats()
+
+
+@router.get("/metadata/query-embedding-cache-stats")
+async def query_embedding_cache_stats():
+    return query_embedding_cache.stats()
+
+
+@router.get("/metadata/chunk-embedding-stats")
+async def chunk_embedding_stats():
+    return chunk_embedding_store.stats()
+
+
+@router.get("/metadata/job-queue-stats")
+async def job_queue_stats():
+    return job_queue.stats()
+
+
+@router.get("/metadata/status-hub-stats")
+async def status_hub_stats():
+    return status_hub.stats()
+
+
+@router.get("/metadata/web-search-cache-stats")
+async def web_search_cache_stats():
+    return search_cache.stats()
+
+
+@router.get("/metadata/answer-cache-stats")
+async def answer_cache_stats():
+    return answer_cache.stats()
+
+
+@router.get("/metadata/prompt-template-stats")
+async def prompt_template_stats():
+    return prompt_templates.stats()
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, status
-from supabase import Client
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from supabase import AsyncClient
 from typing import List
 from uuid import UUID
 
-from app.routes.deps import supabase_dependency
+from app.routes.deps import async_supabase_dependency
 from app.services.chat_service import ChatService
+from app.core.config import settings
 from app.schemas.chat import ChatSessionCreate
+from app.utils.pubsub import status_hub, session_topic
+from app.utils.sse import subscription_stream, SSE_HEADERS
 
 router = APIRouter()
 
@@ -13,16 +17,34 @@ router = APIRouter()
 @router.post("/sessions", status_code=status.HTTP_201_CREATED)
 async def create_session(
     payload: ChatSessionCreate,
-    client: Client = Depends(supabase_dependency)
+    client: AsyncClient = Depends(async_supabase_dependency)
 ):
     service = ChatService(client)
-    return service.create_session(payload)
+    return await service.create_session(payload)
 
 
 @router.get("/workflows/{workflow_id}/sessions")
 async def list_sessions_by_workflow(
     workflow_id: UUID,
-    client: Client = Depends(supabase_dependency)
+    client: AsyncClient = Depends(async_supabase_dependency)
 ):
     service = ChatService(client)
-    return service.list_sessions_by_workflow(workflow_id)
\ No newline at end of file
+    return await service.list_sessions_by_workflow(workflow_id)
+
+
+@router.get("/sessions/{session_id}/events")
+async def session_events(
+    session_id: UUID,
+    client: AsyncClient = Depends(async_supabase_dependency)
+):
+    """Server-Sent Events for assistant message status (generating → completed/failed)."""
+    service = ChatService(client)
+    try:
+        await service.sessions_dao.get_session(session_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return StreamingResponse(
+        subscription_stream(status_hub, session_topic(session_id), settings.STATUS_STREAM_KEEPALIVE),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
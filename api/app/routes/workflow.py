@@ -3,33 +3,41 @@ from uuid import UUID
 
 import asyncio
 from fastapi import APIRouter, Depends, HTTPException,status
-from supabase import Client
-from app.routes.deps import supabase_dependency
+from fastapi.responses import StreamingResponse
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.routes.deps import async_supabase_dependency, get_bearer_token
 from app.schemas.document import DocumentOut
+from app.schemas.job import JobOut
 from app.schemas.workflow import WorkflowOut, WorkflowUpdate, WorkflowCreate
 from app.services.documet_service import DocumentService
+from app.services.job_worker import job_workers, EXECUTE_WORKFLOW
 from app.services.workflow_service import WorkflowService
+from app.utils.job_queue import job_queue
+from app.utils.pubsub import status_hub, workflow_topic
+from app.utils.sse import subscription_stream, SSE_HEADERS
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
 @router.get("/",response_model=List[WorkflowOut])
-async def list_workflows(client: Client = Depends(supabase_dependency)):
+async def list_workflows(client: AsyncClient = Depends(async_supabase_dependency)):
     service = WorkflowService(client)
-    return service.list_workflows()
+    return await service.list_workflows()
 
 @router.post("/",response_model=WorkflowOut, status_code=status
              .HTTP_201_CREATED)
-async def create_workflow(payload: WorkflowCreate, client: Client = Depends(supabase_dependency)):
+async def create_workflow(payload: WorkflowCreate, client: AsyncClient = Depends(async_supabase_dependency)):
     service = WorkflowService(client)
     try:
-        return service.create_workflow(payload)
+        return await service.create_workflow(payload)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{workflow_id}",response_model=WorkflowOut)
-async def get_workflow(workflow_id: UUID, client: Client = Depends(supabase_dependency)):
+async def get_workflow(workflow_id: UUID, client: AsyncClient = Depends(async_supabase_dependency)):
     service = WorkflowService(client)
-    workflow = service.get_workflow(workflow_id)
+    workflow = await service.get_workflow(workflow_id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     return workflow
@@ -38,22 +46,22 @@ async def get_workflow(workflow_id: UUID, client: Client = Depends(supabase_depe
 async def update_workflow(
     workflow_id: UUID,
     payload: WorkflowUpdate,
-    client: Client = Depends(supabase_dependency),
+    client: AsyncClient = Depends(async_supabase_dependency),
 ):
     service = WorkflowService(client)
     try:
-        return service.update_workflow(workflow_id, payload)
+        return await service.update_workflow(workflow_id, payload)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.delete("/{workflow_id}")
 async def delete_workflow(
-    workflow_id: UUID, client: Client = Depends(supabase_dependency)
+    workflow_id: UUID, client: AsyncClient = Depends(async_supabase_dependency)
 ):
     """Delete a workflow."""
     service = WorkflowService(client)
-    success = service.delete_workflow(workflow_id)
+    success = await service.delete_workflow(workflow_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found"
@@ -63,17 +71,78 @@ async def delete_workflow(
 
 @router.get("/{workflow_id}/documents", response_model=List[DocumentOut])
 async def list_documents_by_workflow(
-    workflow_id: UUID, client: Client = Depends(supabase_dependency),
+    workflow_id: UUID, client: AsyncClient = Depends(async_supabase_dependency),
 ):
     service = DocumentService(client)
-    return service.list_documents_by_workflow(workflow_id)
+    return await service.list_documents_by_workflow(workflow_id)
+
+
+def _workflow_job_key(workflow_id: UUID) -> str:
+    return f"workflow:{workflow_id}"
 
 
 @router.post("/{workflow_id}/execute", response_model=dict)
-async def execute_workflow(workflow_id: UUID, client: Client = Depends(supabase_dependency)):
+async def execute_workflow(
+    workflow_id: UUID,
+    client: AsyncClient = Depends(async_supabase_dependency),
+    token: str = Depends(get_bearer_token),
+):
     service = WorkflowService(client)
-    service.validate_workflow(workflow_id)
+    await service.validate_workflow(workflow_id)
+
+    # The worker acts as the caller, so their token travels with the job
+    job = await asyncio.to_thread(
+        job_queue.enqueue,
+        EXECUTE_WORKFLOW,
+        {"workflow_id": str(workflow_id)},
+        access_token=token,
+        dedupe_key=_workflow_job_key(workflow_id),
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+    job_workers.notify()
+    status_hub.publish(
+        workflow_topic(workflow_id),
+        {"type": "workflow_status", "workflow_id": str(workflow_id), "status": "pending", "job_id": job["id"]},
+    )
 
-    asyncio.create_task(service.execute_workflow(workflow_id))
+    return {
+        "message": "Executing Workflow it may take a while...",
+        "status": "pending",
+        "job_id": job["id"],
+        "job_status": job["status"],
+    }
 
-    return {"message": "Executing Workflow it may take a while...", "status": "pending"}
+
+@router.get("/{workflow_id}/jobs", response_model=List[JobOut])
+async def list_workflow_jobs(workflow_id: UUID, client: AsyncClient = Depends(async_supabase_dependency)):
+    # RLS decides whether the caller may see this workflow, and so its jobs
+    if not await WorkflowService(client).get_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return await asyncio.to_thread(job_queue.list_by_dedupe_key, _workflow_job_key(workflow_id))
+
+
+@router.get("/{workflow_id}/jobs/{job_id}", response_model=JobOut)
+async def get_workflow_job(
+    workflow_id: UUID, job_id: str, client: AsyncClient = Depends(async_supabase_dependency)
+):
+    if not await WorkflowService(client).get_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job or job["dedupe_key"] != _workflow_job_key(workflow_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{workflow_id}/events")
+async def workflow_events(workflow_id: UUID, client: AsyncClient = Depends(async_supabase_dependency)):
+    """
+    Server-Sent Events for workflow and document status transitions. The
+    latest known status is sent first, so clients don't need to poll.
+    """
+    if not await WorkflowService(client).get_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return StreamingResponse(
+        subscription_stream(status_hub, workflow_topic(workflow_id), settings.STATUS_STREAM_KEEPALIVE),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
 from datetime import datetime
 
@@ -12,6 +12,8 @@ class ChatMessageCreateMetadata(BaseModel):
     workflow_id: UUID
     is_first: Optional[bool] = None
     search: bool
+    # Restrict retrieval to these documents of the workflow
+    document_ids: Optional[List[UUID]] = None
 
 class ChatMessageCreate(BaseModel):
     message: str
@@ -38,3 +40,4 @@ class QueryRagOut(BaseModel):
     answer: str
     used_web: bool
     sources: SourcesDict
+    timings: Optional[Dict[str, Any]] = None
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Optional, Any, Dict
+
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    class Config:
+        from_attributes = True
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 
+from app.core.config import settings, metadata
+
 
 class WorkflowCreate(BaseModel):
     name: str
@@ -49,12 +51,26 @@ class DocumentUrl(BaseModel):
 class Definition(BaseModel):
     documentUrl: Optional[DocumentUrl] = None
     embeddingModel: Optional[str] = None
+    # Output size of the embedding model; None means its full size
+    embeddingDimension: Optional[int] = None
     llmModel: Optional[str] = None
     prompt: Optional[str] = None
     temperature: Optional[float] = None
     query: Optional[str] = None
     flow: Optional[Flow] = None
 
+    @model_validator(mode="after")
+    def check_embedding_dimension(self):
+        if self.embeddingDimension is not None:
+            model = self.embeddingModel or settings.DEFAUTL_EMBEDDINGS_MODEL
+            supported = metadata.embedding_dimensions.get(model, [])
+            if self.embeddingDimension not in supported:
+                raise ValueError(
+                    f"Embedding dimension {self.embeddingDimension} is not supported by {model}; "
+                    f"choose one of {supported}"
+                )
+        return self
+
 
 class WorkflowOut(BaseModel):
     id: UUID
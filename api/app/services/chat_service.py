@@ -1,98 +1,271 @@
+import asyncio
+import time
 from pprint import pprint
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, AsyncIterator
 from uuid import UUID
 
-from supabase import Client
+from supabase import AsyncClient
 
+from app.clients.vector_store import embedding_space
 from app.core.config import settings
-from app.dao.messages_dao import MessagesDAO
-from app.dao.sessions_dao import SessionsDAO
-from app.dao.workflows_dao import WorkflowsDao
-from app.schemas.chat import ChatSessionCreate, ChatMessageCreate, ChatMessageOut, QueryRagOut
+from app.dao.messages_dao import AsyncMessagesDAO
+from app.dao.sessions_dao import AsyncSessionsDAO
+from app.dao.workflows_dao import AsyncWorkflowsDao
+from app.schemas.chat import ChatSessionCreate, ChatMessageCreate, ChatMessageOut, QueryRagOut, SourcesDict
 from app.schemas.workflow import WorkflowOut
-from app.services.llm_service import query_from_rag
+from app.utils.pubsub import status_hub, session_topic
+from app.services.llm_service import (
+    query_from_rag, prepare_rag_prompt, chat_model, extract_llm_text, lookup_answer, remember_answer,
+)
 
 
 class ChatService:
-    def __init__(self, client: Client):
-        self.sessions_dao = SessionsDAO(client)
-        self.messages_dao = MessagesDAO(client)
-        self.workflows_dao = WorkflowsDao(client)
+    def __init__(self, client: AsyncClient):
+        self.sessions_dao = AsyncSessionsDAO(client)
+        self.messages_dao = AsyncMessagesDAO(client)
+        self.workflows_dao = AsyncWorkflowsDao(client)
 
-    def create_session(self, payload: ChatSessionCreate):
-        return self.sessions_dao.create_session(payload.workflow_id, payload.name)
+    async def create_session(self, payload: ChatSessionCreate):
+        return await self.sessions_dao.create_session(payload.workflow_id, payload.name)
 
-    def list_sessions_by_workflow(self, workflow_id: UUID) -> list:
-        return self.sessions_dao.list_sessions_by_workflow(workflow_id)
+    async def list_sessions_by_workflow(self, workflow_id: UUID) -> list:
+        return await self.sessions_dao.list_sessions_by_workflow(workflow_id)
 
-    def append_user_message(
+    async def append_user_message(
             self, session_id: UUID, payload: ChatMessageCreate, search: bool = False
     ) -> ChatMessageOut:
-        message = self.messages_dao.insert_message(
+        message = await self.messages_dao.insert_message(
             session_id=session_id, role="user", message=payload.message, metadata=dict({
                 "search": search
             })
         )
         return ChatMessageOut(**message)
 
-    def generate_assistant_message(self,
+    async def generate_assistant_message(self,
                                    user_message: str,
                                    system_prompt: Optional[str],
                                    workflow_id: UUID,
                                    temperature: float = 0.7,
                                    model: str = "gemini-2.5-pro",
                                    embeddingModel: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
-                                   search: bool = False) -> QueryRagOut:
-        response = query_from_rag(
+                                   search: bool = False,
+                                   document_ids: Optional[List[UUID]] = None) -> QueryRagOut:
+        response = await query_from_rag(
             temperature=temperature,
             sys_prompt=system_prompt,
             workflow_id=workflow_id,
             embeddings_model=embeddingModel,
             query=user_message,
             search=search,
-            model=model
+            model=model,
+            document_ids=document_ids,
         )
 
         return response
 
-    def append_assistant_message(
+    async def append_assistant_message(
             self,
             message: str,
             message_id: UUID,
             metadata: Dict[str, Any] = None,
     ) -> ChatMessageOut:
-        message_data = self.messages_dao.update_message(
+        message_data = ChatMessageOut(**await self.messages_dao.update_message(
             message_id=message_id, message=message, metadata=metadata
+        ))
+        status = (metadata or {}).get("status", "completed")
+        status_hub.publish(
+            session_topic(message_data.session_id),
+            {"type": "message_status", "message_id": str(message_id), "status": status},
         )
-        return ChatMessageOut(**message_data)
+        return message_data
 
-    def create_generating_assistant_message(
+    async def create_generating_assistant_message(
             self, session_id: UUID
     ) -> ChatMessageOut:
-        message_data = self.messages_dao.insert_message(
+        message_data = ChatMessageOut(**await self.messages_dao.insert_message(
             session_id=session_id, role="assistant", metadata={"status": "generating"}
+        ))
+        status_hub.publish(
+            session_topic(session_id),
+            {"type": "message_status", "message_id": str(message_data.id), "status": "generating"},
         )
-        return ChatMessageOut(**message_data)
+        return message_data
 
-    def list_messages(self, session_id: UUID) -> list:
+    async def list_messages(self, session_id: UUID) -> list:
         """List all messages in a session."""
-        messages = self.messages_dao.list_messages_by_session(session_id)
+        messages = await self.messages_dao.list_messages_by_session(session_id)
         return [ChatMessageOut(**msg) for msg in messages]
 
-    async def process_chat_message(
-            self, session_id: UUID, payload: ChatMessageCreate
-    ) -> ChatMessageOut:
-        session = self.sessions_dao.get_session(session_id)
+    async def _start_reply(self, session_id: UUID, payload: ChatMessageCreate):
+        """Store the user message and the generating placeholder. Returns (session, workflow, placeholder)."""
+        session = await self.sessions_dao.get_session(session_id)
         if not session:
             raise ValueError("Session not found")
-        workflow_response = self.workflows_dao.get_workflow(
+        workflow_response = await self.workflows_dao.get_workflow(
             workflow_id=session["workflow_id"]
         )
         workflow = WorkflowOut(**workflow_response)
-        self.append_user_message(session_id, payload)
-        message_data = self.create_generating_assistant_message(session_id)
+        await self.append_user_message(session_id, payload)
+        message_data = await self.create_generating_assistant_message(session_id)
+        return session, workflow, message_data
+
+    async def stream_chat_message(
+            self, session_id: UUID, payload: ChatMessageCreate
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Like process_chat_message, but returns events to send while the model
+        streams: "message" (placeholder created), "token" (text delta), then
+        "done" with the stored message or "error". The partial answer is written
+        to the placeholder row at most every STREAM_PARTIAL_WRITE_INTERVAL seconds.
+
+        The placeholder is created before returning, so a missing session raises
+        here rather than mid-stream.
+        """
+        started = time.perf_counter()
+        session, workflow, message_data = await self._start_reply(session_id, payload)
+        return self._stream_reply(session, workflow, message_data, payload, started)
+
+    async def _stream_reply(
+            self,
+            session: Dict[str, Any],
+            workflow: WorkflowOut,
+            message_data: ChatMessageOut,
+            payload: ChatMessageCreate,
+            started: float,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        yield {"event": "message", "data": {"message_id": message_data.id, "status": "generating"}}
+
+        definition = workflow.definition
+        search = payload.metadata.search if payload.metadata else False
+        document_ids = payload.metadata.document_ids if payload.metadata else None
+        model = definition.llmModel or "gemini-2.5-flash"
+        temperature = definition.temperature if definition.temperature is not None else 0.7
+        embeddings_model = embedding_space(definition.embeddingModel, definition.embeddingDimension)
+        answer = ""
+        partial_write: Optional[asyncio.Task] = None
+        # Set once the placeholder row has its final content, whatever the outcome
+        finished = False
+
+        try:
+            cache_key, query_vector, cached = await lookup_answer(
+                payload.message, session["workflow_id"], embeddings_model,
+                sys_prompt=definition.prompt, model=model, temperature=temperature, search=search,
+                document_ids=document_ids,
+            )
+            if cached is not None:
+                # Replay the cached answer as a single token so clients need no special case
+                yield {"event": "token", "data": {"delta": cached.answer}}
+                final_message = await self.append_assistant_message(
+                    message=cached.answer,
+                    message_id=message_data.id,
+                    metadata={
+                        "sources": cached.sources,
+                        "used_web": cached.used_web,
+                        "timings": {**cached.timings, "total": round(time.perf_counter() - started, 4)},
+                    },
+                )
+                finished = True
+                yield {"event": "done", "data": final_message}
+                return
+
+            formatted_prompt, rag_context, web_results, timings = await prepare_rag_prompt(
+                query=payload.message,
+                workflow_id=session["workflow_id"],
+                search=search,
+                embeddings_model=embeddings_model,
+                sys_prompt=definition.prompt,
+                document_ids=document_ids,
+                model=model,
+            )
+            llm = chat_model(model, temperature)
+
+            first_token_at = None
+            last_write = time.monotonic()
+            async for chunk in llm.astream(formatted_prompt):
+                delta = extract_llm_text(chunk.content)
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                answer += delta
+                yield {"event": "token", "data": {"delta": delta}}
+
+                # One partial write in flight at a time; it never holds up the stream
+                now = time.monotonic()
+                if now - last_write >= settings.STREAM_PARTIAL_WRITE_INTERVAL and (
+                        partial_write is None or partial_write.done()
+                ):
+                    last_write = now
+                    partial_write = asyncio.create_task(self.messages_dao.update_message(
+                        message_id=message_data.id, message=answer, metadata={"status": "generating"}
+                    ))
+
+            if partial_write is not None:
+                # The final write must land after any partial one
+                await asyncio.gather(partial_write, return_exceptions=True)
+
+            remember_answer(session["workflow_id"], cache_key, query_vector, QueryRagOut(
+                answer=answer,
+                used_web=web_results is not None,
+                sources=SourcesDict(rag=rag_context, web=web_results),
+            ))
+
+            final_message = await self.append_assistant_message(
+                message=answer,
+                message_id=message_data.id,
+                metadata={
+                    "sources": SourcesDict(rag=rag_context, web=web_results),
+                    "used_web": web_results is not None,
+                    "timings": {
+                        **timings,
+                        "time_to_first_token": round(first_token_at - started, 4) if first_token_at else None,
+                        "total": round(time.perf_counter() - started, 4),
+                    },
+                },
+            )
+            finished = True
+            yield {"event": "done", "data": final_message}
+
+        except Exception as e:
+            print(f"[ChatService] Streaming reply for session {session['id']} failed: {e}")
+            if partial_write is not None:
+                await asyncio.gather(partial_write, return_exceptions=True)
+            try:
+                await self.append_assistant_message(
+                    message=answer, message_id=message_data.id, metadata={"status": "failed", "error": str(e)}
+                )
+            except Exception as write_error:
+                print(f"[ChatService] Could not mark message {message_data.id} failed: {write_error}")
+            finished = True
+            yield {"event": "error", "data": {"message_id": message_data.id, "detail": str(e)}}
+
+        finally:
+            if not finished:
+                # The client went away (CancelledError / GeneratorExit): don't leave the row "generating"
+                await self._finish_abandoned_reply(message_data.id, answer, partial_write)
+
+    async def _finish_abandoned_reply(
+            self, message_id: UUID, answer: str, partial_write: Optional[asyncio.Task]
+    ) -> None:
+        async def write():
+            if partial_write is not None:
+                await asyncio.gather(partial_write, return_exceptions=True)
+            await self.append_assistant_message(
+                message=answer, message_id=message_id, metadata={"status": "cancelled"}
+            )
+
+        # Shielded so the cancellation that stopped the stream can't also stop the final write
+        try:
+            await asyncio.shield(asyncio.ensure_future(write()))
+        except Exception as e:
+            print(f"[ChatService] Could not mark message {message_id} cancelled: {e}")
+
+    async def process_chat_message(
+            self, session_id: UUID, payload: ChatMessageCreate
+    ) -> ChatMessageOut:
+        session, workflow, message_data = await self._start_reply(session_id, payload)
         pprint("Generating assistant message")
-        assistant_response = self.generate_assistant_message(
+        assistant_response = await self.generate_assistant_message(
             user_message=payload.message,
             system_prompt=workflow.definition.prompt,
             temperature=(
@@ -108,14 +281,16 @@ class ChatService:
                 else "gemini-2.5-flash"
             ),
             workflow_id=session["workflow_id"],
-            embeddingModel = workflow.definition.embeddingModel,
-            search = payload.metadata.search if payload.metadata else False
+            embeddingModel = embedding_space(workflow.definition.embeddingModel, workflow.definition.embeddingDimension),
+            search = payload.metadata.search if payload.metadata else False,
+            document_ids=payload.metadata.document_ids if payload.metadata else None,
         )
         pprint(f"Assistant message: {assistant_response}")
-        return self.append_assistant_message(
+        return await self.append_assistant_message(
             message=assistant_response.answer, message_id=message_data.id,
             metadata={
                 "sources": assistant_response.sources,
                 "used_web": assistant_response.used_web,
+                "timings": assistant_response.timings,
             }
         )
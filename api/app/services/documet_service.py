@@ -1,88 +1,125 @@
-import os.path
+import asyncio
 from typing import List, Optional
 from uuid import UUID
 
-from langchain_text_splitters.character import RecursiveCharacterTextSplitter
-from supabase import Client
+from supabase import AsyncClient
 
-from app.dao.documents_dao import DocumentsDAO
-from app.schemas.document import DocumentCreate, DocumentOut
 from app.core.config import settings
-import requests
-
-from langchain_community.document_loaders import PyPDFLoader
-import pprint
-
-from app.services.llm_service import add_to_chroma_db
+from app.dao.documents_dao import AsyncDocumentsDAO
+from app.schemas.document import DocumentCreate, DocumentOut
+from app.services.ingestion_pipeline import ingest_pdf
+from app.services.llm_service import rebuild_local_index
+from app.utils.answer_cache import answer_cache
+from app.utils.downloader import download_file, DownloadedFile
+from app.utils.pubsub import status_hub, workflow_topic
 
 
 class DocumentService:
-    def __init__(self, client: Client):
+    def __init__(self, client: AsyncClient):
         self.client = client
-        self.document_dao = DocumentsDAO(client)
+        self.document_dao = AsyncDocumentsDAO(client)
 
-    def create_document(self, payload: DocumentCreate) -> DocumentOut:
-        document = self.document_dao.create_document(
+    async def create_document(self, payload: DocumentCreate) -> DocumentOut:
+        document = await self.document_dao.create_document(
             workflow_id=payload.workflow_id,
             file_name=payload.file_name,
             file_url=payload.file_url,
         )
         return DocumentOut(**document)
 
-    def list_documents_by_workflow(self, workflow_id: UUID) -> List[DocumentOut]:
-        documents = self.document_dao.list_documents_by_workflow(workflow_id)
+    async def list_documents_by_workflow(self, workflow_id: UUID) -> List[DocumentOut]:
+        documents = await self.document_dao.list_documents_by_workflow(workflow_id)
         return [DocumentOut(**doc) for doc in documents]
 
-    def get_document(self, document_id: UUID) -> DocumentOut:
-        document = self.document_dao.get_document(document_id)
+    async def get_document(self, document_id: UUID) -> DocumentOut:
+        document = await self.document_dao.get_document(document_id)
         return DocumentOut(**document)
 
-    def update_document_status(self, document_id: UUID, status: str) -> DocumentOut:
-        document = self.document_dao.update_document_status(document_id, status)
-        return DocumentOut(**document)
-
-    def get_documents_by_workflow(self, workflow_id: UUID) -> DocumentOut:
-        documents = self.document_dao.list_documents_by_workflow(workflow_id)
-        return DocumentOut(**documents[0])
+    async def update_document_status(self, document_id: UUID, status: str) -> DocumentOut:
+        document = DocumentOut(**await self.document_dao.update_document_status(document_id, status))
+        status_hub.publish(
+            workflow_topic(document.workflow_id),
+            {"type": "document_status", "document_id": str(document_id), "status": status},
+        )
+        if status in ("processed", "failed"):
+            # Ingestion touched the workflow's index, so cached answers may be stale
+            answer_cache.invalidate(document.workflow_id)
+        return document
 
-    def download_document(self, document_id: UUID) -> str:
-        document = self.get_document(document_id)
+    async def download_document(self, document_id: UUID) -> DownloadedFile:
+        document = await self.get_document(document_id)
         if not document:
             raise ValueError(
                 f"Document with id {document_id} was not found."
             )
-        if not os.path.exists(settings.TEMP_DIR):
-            os.makedirs(settings.TEMP_DIR)
 
         print("Downloading document")
 
-        local_path = os.path.join(settings.TEMP_DIR, f"{document.file_name}")
+        downloaded = await download_file(document.file_url, document.file_name)
 
-        response = requests.get(document.file_url)
-        if response.status_code != 200:
-            raise ValueError("Failed to download document")
-
-        with open(local_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        print("Successfully downloaded document")
-        return local_path
-
-    def process_and_store_document(self, document_id: UUID, workflow_id: UUID,
-                                   embedding_model: Optional[str], ):
-
-        file_path = self.download_document(document_id)
+        print(
+            f"Successfully downloaded document ({downloaded.size} bytes, "
+            f"{'in memory' if downloaded.in_memory else 'on disk'}, sha256 {downloaded.sha256[:12]})"
+        )
+        return downloaded
 
-        loader = PyPDFLoader(file_path)
-        docs = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        all_splits = text_splitter.split_documents(docs)
+    async def process_and_store_document(self, document_id: UUID, workflow_id: UUID,
+                                         embedding_model: Optional[str], ):
 
-        print(docs[0].metadata)
+        downloaded = await self.download_document(document_id)
 
-        add_to_chroma_db(workflow_id, chunks=all_splits, embeddings_model=embedding_model)
-        self.update_document_status(document_id, "processed")
-        print("Document was successfully processed")
-        os.remove(file_path)
-        return {"document_id": document_id, "chunks_added": len(all_splits)}
\ No newline at end of file
+        try:
+            report = await asyncio.to_thread(
+                ingest_pdf, downloaded.source, workflow_id, document_id, embedding_model, downloaded.name
+            )
+        finally:
+            downloaded.cleanup()
+
+        await self.update_document_status(document_id, "processed")
+        print(
+            f"Document was successfully processed: {report['pages']} pages, "
+            f"{report['added']} added, {report['updated']} updated, {report['removed']} removed, "
+            f"{report['embedded']} chunks embedded, {report['embed_calls_saved']} reused "
+            f"in {report['seconds']}s"
+        )
+        return {"document_id": document_id, "chunks_added": report["chunks"], **report}
+
+    async def process_workflow_documents(self, workflow_id: UUID, embedding_model: Optional[str]) -> dict:
+        """
+        Ingest every document of the workflow that isn't processed yet, at most
+        INGEST_MAX_CONCURRENT_DOCUMENTS at a time. Each document's status moves
+        to in_progress and then processed or failed independently, so one bad
+        file doesn't stop the others.
+        """
+        documents = await self.list_documents_by_workflow(workflow_id)
+        pending = [document for document in documents if document.status != "processed"]
+        semaphore = asyncio.Semaphore(max(1, settings.INGEST_MAX_CONCURRENT_DOCUMENTS))
+
+        async def ingest(document: DocumentOut) -> dict:
+            async with semaphore:
+                await self.update_document_status(document.id, "in_progress")
+                try:
+                    return await self.process_and_store_document(
+                        document_id=document.id, workflow_id=workflow_id, embedding_model=embedding_model
+                    )
+                except Exception as e:
+                    print(f"Document {document.id} ({document.file_name}) failed to process: {e}")
+                    await self.update_document_status(document.id, "failed")
+                    return {"document_id": document.id, "error": str(e)}
+
+        results = await asyncio.gather(*(ingest(document) for document in pending))
+
+        if pending and settings.VECTOR_INDEX_BACKEND == "local":
+            # Once per run rather than per document; retrieval uses the old index (or Chroma) meanwhile
+            try:
+                index = await asyncio.to_thread(rebuild_local_index, workflow_id, embedding_model)
+                print(f"Local index for workflow {workflow_id} rebuilt: {index['count']} chunks in {index['seconds']}s")
+            except Exception as e:
+                print(f"Local index rebuild for workflow {workflow_id} failed, retrieval stays on Chroma: {e}")
+
+        return {
+            "documents": len(documents),
+            "already_processed": len(documents) - len(pending),
+            "processed": [result for result in results if "error" not in result],
+            "failed": [result for result in results if "error" in result],
+        }
@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from typing import Iterator, Iterable, List, Any, Optional, Union, BinaryIO
+from uuid import UUID
+
+from langchain_core.documents import Document
+from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+
+from app.core.config import settings
+from app.services.llm_service import add_to_chroma_db, remove_stale_chunks
+from app.utils.pdf_extract import iter_page_texts, extraction_pool
+
+_DONE = object()
+
+
+def stream_pages(file_path: Union[str, BinaryIO], source_name: Optional[str] = None) -> Iterator[Document]:
+    """
+    One Document per PDF page, in page order. With PDF_EXTRACT_WORKERS > 0 page
+    ranges are parsed in a process pool, off the API process's GIL.
+    """
+    workers = settings.PDF_EXTRACT_WORKERS
+    executor = extraction_pool(workers) if workers > 0 else None
+    for _number, text, page_metadata in iter_page_texts(
+            file_path,
+            executor=executor,
+            pages_per_task=settings.PDF_PAGES_PER_TASK,
+            max_pending=2 * workers,
+            source_name=source_name,
+    ):
+        yield Document(page_content=text, metadata=page_metadata)
+
+
+def stream_chunks(
+        pages: Iterable[Document],
+        document_id: UUID,
+        text_splitter: Optional[RecursiveCharacterTextSplitter] = None,
+) -> Iterator[Document]:
+    text_splitter = text_splitter or RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=100, add_start_index=True
+    )
+    for page in pages:
+        for chunk in text_splitter.split_documents([page]):
+            chunk.metadata["document_id"] = str(document_id)
+            yield chunk
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_pdf(
+        file_path: Union[str, BinaryIO],
+        workflow_id: UUID,
+        document_id: UUID,
+        embedding_model: Optional[str],
+        source_name: Optional[str] = None,
+) -> dict:
+    """
+    page extract → split → embed → upsert, with a bounded queue between parsing
+    and embedding. Parsing the next pages overlaps with embedding the current
+    batch, and memory stays flat whatever the page count.
+    """
+    started = time.perf_counter()
+    batches: "queue.Queue[Any]" = queue.Queue(maxsize=settings.INGEST_QUEUE_BATCHES)
+    # Set when the consumer gives up, so the producer stops parsing at the next page
+    stop = threading.Event()
+    pages_seen = 0
+
+    def produce():
+        def counted(pages):
+            nonlocal pages_seen
+            for page in pages:
+                if stop.is_set():
+                    return
+                pages_seen += 1
+                yield page
+
+        try:
+            chunks = stream_chunks(counted(stream_pages(file_path, source_name)), document_id)
+            for batch in batched(chunks, settings.INGEST_BATCH_CHUNKS):
+                batches.put(batch)
+            batches.put(_DONE)
+        except BaseException as e:
+            batches.put(e)
+
+    producer = threading.Thread(target=produce, name=f"ingest-{document_id}", daemon=True)
+    producer.start()
+
+    report = {
+        "pages": 0, "chunks": 0, "stored": 0, "added": 0, "updated": 0, "unchanged": 0, "removed": 0,
+        "embedded": 0, "embed_calls_saved": 0, "embedding_batches": [],
+    }
+    indexed_ids = set()
+    try:
+        while True:
+            item = batches.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            batch_report = add_to_chroma_db(
+                workflow_id, chunks=item, embeddings_model=embedding_model, document_id=document_id
+            )
+            indexed_ids.update(batch_report.pop("ids"))
+            for key in ("chunks", "stored", "added", "updated", "unchanged", "embedded", "embed_calls_saved"):
+                report[key] += batch_report[key]
+            report["embedding_batches"].extend(batch_report["embedding"].get("batches", []))
+    finally:
+        # Stop the producer and unblock it if we bailed out early
+        stop.set()
+        while producer.is_alive():
+            try:
+                batches.get_nowait()
+            except queue.Empty:
+                producer.join(timeout=0.1)
+
+    # Only after the whole document is indexed: a failed run must not delete anything
+    report["removed"] = remove_stale_chunks(workflow_id, document_id, indexed_ids, embedding_model, source_name)
+    report["pages"] = pages_seen
+    report["seconds"] = round(time.perf_counter() - started, 4)
+    return report
@@ -1,67 +1,259 @@
+import asyncio
 import os
+import time
 from pprint import pprint
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Set, Tuple, Dict, Awaitable
 from uuid import UUID
 
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_core.prompts.chat import ChatPromptTemplate
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-from app.core.config import settings, metadata
+from app.clients.llm_client import llm_client_pool
+from app.clients.local_index import local_index
+from app.clients.vector_store import vector_store_registry, is_partitioned
+from app.core.config import settings
 from app.schemas.chat import QueryRagOut, SourcesDict
-from app.utils.web_search import search_internet
+from app.utils.answer_cache import answer_cache, answer_config_key
+from app.utils.context_packer import CHUNK_SEPARATOR, pack_chunks, estimate_tokens, context_token_budget
+from app.utils.embedding_cache import query_embedding_cache, chunk_embedding_store, chunk_content_hash
+from app.utils.prompt_templates import prompt_templates
+from app.utils.web_search import asearch_internet
 
 load_dotenv()
 
 
+def chunk_id(workflow_id: UUID, document_id: Optional[UUID], content_hash: str) -> str:
+    # Scoped to the document so re-indexing one document never touches another's chunks
+    if document_id is None:
+        return f"{workflow_id}:{content_hash}"
+    return f"{workflow_id}:{document_id}:{content_hash}"
+
+
 def add_to_chroma_db(
         workflow_id: UUID,
         chunks: List[Any],
-        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL
-):
-    embeddings = GoogleGenerativeAIEmbeddings(model=embeddings_model)
-    vector_store = Chroma(
-        collection_name="workflow_collection",
-        embedding_function=embeddings,
-        persist_directory=settings.CHROMA_PATH,
-    )
-
+        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
+        document_id: Optional[UUID] = None,
+) -> dict:
+    """
+    Index `chunks` incrementally. Only the candidate IDs are looked up: new
+    chunks are embedded and added, chunks whose metadata moved (page, source)
+    are updated in place, identical chunks are left alone.
+    """
+    embeddings_model = embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL
+    collection = vector_store_registry.workflow_store(embeddings_model, workflow_id)._collection
+
+    # Chunk IDs are content addressed, so an unchanged chunk keeps its ID across re-uploads
+    unique_chunks = {}
     for chunk in chunks:
+        content_hash = chunk_content_hash(embeddings_model, chunk.page_content)
         chunk.metadata['workflow_id'] = str(workflow_id)
+        chunk.metadata['content_hash'] = content_hash
+        chunk.metadata['embedding_model'] = embeddings_model
+        unique_chunks.setdefault(chunk_id(workflow_id, document_id, content_hash), chunk)
+
+    ids = list(unique_chunks.keys())
+    existing = collection.get(ids=ids, include=["metadatas"]) if ids else {"ids": [], "metadatas": []}
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+
+    new_ids = [id_ for id_ in ids if id_ not in existing_metadata]
+    changed_ids = [
+        id_ for id_ in ids
+        if id_ in existing_metadata and existing_metadata[id_] != unique_chunks[id_].metadata
+    ]
+
+    embedder = vector_store_registry.batch_embedder(embeddings_model)
+    embed_report = {}
+    embedded = 0
+
+    def embed_missing(missing_texts: List[str]) -> List[List[float]]:
+        vectors, report = embedder.embed(missing_texts)
+        embed_report.update(report)
+        return vectors
+
+    if new_ids:
+        texts = [unique_chunks[id_].page_content for id_ in new_ids]
+        _hashes, vectors, embedded = chunk_embedding_store.embed(embeddings_model, texts, embed_missing)
+        pprint(f"Adding {len(new_ids)} chunks to Chroma")
+        collection.add(
+            ids=new_ids,
+            embeddings=vectors,
+            documents=texts,
+            metadatas=[unique_chunks[id_].metadata for id_ in new_ids],
+        )
 
-    pprint("Adding chunks to Chroma")
-    vector_store.add_documents(chunks)
+    if changed_ids:
+        # Same text means same vector; only the metadata needs rewriting
+        collection.update(ids=changed_ids, metadatas=[unique_chunks[id_].metadata for id_ in changed_ids])
+
+    return {
+        "chunks": len(chunks),
+        "stored": len(unique_chunks),
+        "added": len(new_ids),
+        "updated": len(changed_ids),
+        "unchanged": len(ids) - len(new_ids) - len(changed_ids),
+        "embedded": embedded,
+        "embed_calls_saved": len(chunks) - embedded,
+        "embedding": embed_report,
+        "ids": ids,
+    }
+
+
+def legacy_chunk_ids(collection, workflow_id: UUID, file_name: str) -> List[str]:
+    """
+    IDs of a document's chunks stored before chunks carried a document_id.
+    Those were tagged only with PyPDFLoader's source, the download path.
+    """
+    where = {"source": os.path.join(settings.TEMP_DIR, file_name)}
+    workflow_where = retrieval_filter(str(workflow_id))
+    if workflow_where:
+        where = {"$and": [workflow_where, where]}
+    found = collection.get(where=where, include=["metadatas"])
+    return [
+        id_ for id_, chunk_metadata in zip(found["ids"], found["metadatas"])
+        if not (chunk_metadata or {}).get("document_id")
+    ]
+
+
+def remove_stale_chunks(
+        workflow_id: UUID,
+        document_id: UUID,
+        keep_ids: Set[str],
+        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
+        file_name: Optional[str] = None,
+) -> int:
+    """
+    Delete the document's chunks that are not in its new version, including
+    any it left from before chunks carried a document_id. Returns how many.
+    """
+    embeddings_model = embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL
+    collection = vector_store_registry.workflow_store(embeddings_model, workflow_id)._collection
+
+    # Only this document's IDs are fetched, never the whole collection
+    current = collection.get(where=retrieval_filter(str(workflow_id), [document_id]), include=[])["ids"]
+    stale = [id_ for id_ in current if id_ not in keep_ids]
+    if file_name:
+        stale.extend(legacy_chunk_ids(collection, workflow_id, file_name))
+    for start in range(0, len(stale), 500):
+        collection.delete(ids=stale[start:start + 500])
+    return len(stale)
+
+
+def remove_workflow_chunks(workflow_id: UUID, embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL) -> int:
+    """Delete every chunk the workflow has in one embedding space. Returns how many."""
+    collection = vector_store_registry.workflow_store(embeddings_model, workflow_id)._collection
+    where = retrieval_filter(str(workflow_id))
+    removed = 0
+    while True:
+        ids = collection.get(where=where, include=[], limit=5000)["ids"]
+        if not ids:
+            return removed
+        collection.delete(ids=ids)
+        removed += len(ids)
+
+
+def retrieval_filter(workflow_id: str, document_ids: Optional[List[UUID]] = None) -> Optional[dict]:
+    """Chroma `where` clause for a workflow, optionally narrowed to some of its documents."""
+    clauses = []
+    # A per-workflow collection already holds only this workflow's chunks
+    if not is_partitioned():
+        clauses.append({"workflow_id": str(workflow_id)})
+    if document_ids:
+        clauses.append({"document_id": {"$in": [str(document_id) for document_id in document_ids]}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
 
 def retrieve_from_rag(
         query: str,
         workflow_id: str,
         top_k: int = 4,
-        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL
-) -> str:
-    embeddings = GoogleGenerativeAIEmbeddings(model=embeddings_model)
-
-    vector_store = Chroma(
-        collection_name="workflow_collection",
-        embedding_function=embeddings,
-        persist_directory=settings.CHROMA_PATH,
+        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
+        document_ids: Optional[List[UUID]] = None,
+) -> List[Document]:
+    """Top-k chunks for the query, most relevant first."""
+    vector_store = vector_store_registry.workflow_store(embeddings_model, workflow_id)
+    query_embedding = query_embedding_cache.get_or_compute(
+        embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL,
+        query,
+        vector_store_registry.embeddings(embeddings_model).embed_query,
     )
 
-    results = vector_store.similarity_search_with_score(
-        query,
+    if settings.VECTOR_INDEX_BACKEND == "local":
+        hits = local_index.search(
+            embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL, workflow_id, query_embedding, top_k, document_ids
+        )
+        if hits is not None:
+            return chunks_by_id(vector_store._collection, [chunk_id for chunk_id, _score in hits])
+
+    results = vector_store.similarity_search_by_vector_with_relevance_scores(
+        query_embedding,
         k=top_k,
-        filter={"workflow_id": workflow_id},
+        filter=retrieval_filter(workflow_id, document_ids),
     )
 
-    context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in results])
+    return [doc for doc, _score in results]
 
-    return context_text
 
+def chunks_by_id(collection, ids: List[str]) -> List[Document]:
+    """Chunks for `ids` in the given order; IDs deleted since the index was built are skipped."""
+    if not ids:
+        return []
+    found = collection.get(ids=ids, include=["documents", "metadatas"])
+    by_id = {
+        id_: Document(page_content=text, metadata=chunk_metadata or {})
+        for id_, text, chunk_metadata in zip(found["ids"], found["documents"], found["metadatas"])
+    }
+    return [by_id[id_] for id_ in ids if id_ in by_id]
 
-def build_context(rag_context: str, web_results: dict | None) -> str:
+
+def rebuild_local_index(
+        workflow_id: UUID,
+        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
+        batch_size: int = 5000,
+) -> dict:
+    """Rewrite the workflow's local index from the vectors stored in Chroma; nothing is re-embedded."""
+    embeddings_model = embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL
+    collection = vector_store_registry.workflow_store(embeddings_model, workflow_id)._collection
+    where = retrieval_filter(str(workflow_id))
+
+    def batches():
+        offset = 0
+        while True:
+            batch = collection.get(
+                where=where, include=["embeddings", "metadatas"], limit=batch_size, offset=offset
+            )
+            if not batch["ids"]:
+                return
+            yield (
+                batch["ids"],
+                batch["embeddings"],
+                [(chunk_metadata or {}).get("document_id") for chunk_metadata in batch["metadatas"]],
+            )
+            offset += len(batch["ids"])
+
+    return local_index.write(embeddings_model, workflow_id, batches())
+
+
+def build_context(
+        rag_chunks: List[Document],
+        web_results: dict | None,
+        token_budget: int,
+) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Pack retrieved chunks (merged, deduplicated, best first) and web results
+    into one context within `token_budget`; documents take precedence.
+    Returns (combined context, document context, packing report).
+    """
+    pieces, report = pack_chunks(
+        ((doc.page_content, doc.metadata) for doc in rag_chunks), token_budget
+    )
+    rag_context = CHUNK_SEPARATOR.join(pieces)
     parts = []
+    used = report["packed_tokens"]
 
     if rag_context:
         parts.append("### DOCUMENT CONTEXT\n" + rag_context)
@@ -69,13 +261,18 @@ def build_context(rag_context: str, web_results: dict | None) -> str:
     if web_results:
         web_texts = []
         for article in web_results.get("articles", []):
-            web_texts.append(
-                f"- {article['title']}: {article['snippet']} ({article['url']})"
-            )
+            line = f"- {article['title']}: {article['snippet']} ({article['url']})"
+            report["raw_tokens"] += estimate_tokens(line)
+            if used + estimate_tokens(line) > token_budget:
+                report["dropped"] += 1
+                continue
+            used += estimate_tokens(line)
+            web_texts.append(line)
         if web_texts:
             parts.append("### WEB CONTEXT\n" + "\n".join(web_texts))
 
-    return "\n\n".join(parts)
+    report["packed_tokens"] = used
+    return "\n\n".join(parts), rag_context, report
 def extract_llm_text(content) -> str:
 
     if content is None:
@@ -96,43 +293,93 @@ def extract_llm_text(content) -> str:
     return str(content)
 
 
-def query_from_rag(
+def chat_model(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    return llm_client_pool.get(model, temperature, max_retries=2)
+
+
+async def _timed_source(name: str, source: Awaitable[Any], timeout: float, timings: Dict[str, Any]) -> Any:
+    """Await one context source; on timeout or error log it and return None."""
+    started = time.perf_counter()
+    result, status = None, "ok"
+    try:
+        result = await asyncio.wait_for(source, timeout=timeout)
+    except asyncio.TimeoutError:
+        status = "timeout"
+        print(f"[RAG] {name} timed out after {timeout}s, answering without it")
+    except Exception as e:
+        status = "error"
+        print(f"[RAG] {name} failed, answering without it: {e}")
+    timings[name] = {"seconds": round(time.perf_counter() - started, 4), "status": status}
+    return result
+
+
+async def gather_context(
         query: str,
         workflow_id: UUID,
         top_k: int = 4,
         search: bool = False,
         embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
-        sys_prompt: Optional[str] = None,
-        model: str = "gemini-2.5-pro",
-        temperature: float = 0.7,
-) -> QueryRagOut:
-    web_results = None
+        document_ids: Optional[List[UUID]] = None,
+) -> Tuple[List[Document], Optional[dict], Dict[str, Any]]:
+    """
+    Vector retrieval and (optionally) web search, concurrently, each under its
+    own timeout. Returns (retrieved chunks, web results, timings); a source
+    that timed out or failed comes back empty.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, Any] = {}
+
+    retrieval = _timed_source(
+        "retrieval",
+        asyncio.to_thread(
+            retrieve_from_rag,
+            query=query,
+            workflow_id=str(workflow_id),
+            top_k=top_k,
+            embeddings_model=embeddings_model,
+            document_ids=document_ids,
+        ),
+        settings.RAG_RETRIEVAL_TIMEOUT,
+        timings,
+    )
     if search:
-        web_results = search_internet(query)
+        web_search = _timed_source(
+            "web_search", asearch_internet(query), settings.WEB_SEARCH_TIMEOUT, timings
+        )
+        rag_chunks, web_results = await asyncio.gather(retrieval, web_search)
+    else:
+        rag_chunks, web_results = await retrieval, None
+
+    timings["context_seconds"] = round(time.perf_counter() - started, 4)
+    return rag_chunks or [], web_results, timings
+
 
-    rag_context = retrieve_from_rag(
+async def prepare_rag_prompt(
+        query: str,
+        workflow_id: UUID,
+        top_k: int = 4,
+        search: bool = False,
+        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
+        sys_prompt: Optional[str] = None,
+        document_ids: Optional[List[UUID]] = None,
+        model: Optional[str] = None,
+) -> Tuple[str, str, Optional[dict], Dict[str, Any]]:
+    """
+    Gather context, pack it within `model`'s context budget and fill the
+    prompt. Returns (prompt, rag context, web results, timings).
+    """
+    rag_chunks, web_results, timings = await gather_context(
         query=query,
-        workflow_id=str(workflow_id),
+        workflow_id=workflow_id,
         top_k=top_k,
+        search=search,
         embeddings_model=embeddings_model,
+        document_ids=document_ids,
     )
 
-    combined_context = build_context(rag_context, web_results)
-
-    base_system_prompt = (
-        metadata.RAG_WITH_WEB_SYSTEM_PROMPT if search
-        else metadata.general_system_prompt
-    )
-
-    if sys_prompt:
-        full_system_prompt = base_system_prompt + "\n\n" + sys_prompt
-    else:
-        full_system_prompt = base_system_prompt
-
-    prompt_template = ChatPromptTemplate.from_template(
-        full_system_prompt + "\n\nContext:\n{context}\n\nQuestion: {question}"
-    )
+    combined_context, rag_context, packing = build_context(rag_chunks, web_results, context_token_budget(model))
 
+    prompt_template = prompt_templates.get(sys_prompt, search)
     formatted_prompt = prompt_template.format(
         context=combined_context,
         question=query,
@@ -141,24 +388,129 @@ def query_from_rag(
     pprint("🔥 FINAL PROMPT 🔥")
     pprint(formatted_prompt)
 
-    llm = ChatGoogleGenerativeAI(
+    timings["context"] = {
+        **packing,
+        "prompt_tokens": estimate_tokens(formatted_prompt),
+        "tokens_saved": packing["raw_tokens"] - packing["packed_tokens"],
+    }
+
+    return formatted_prompt, rag_context, web_results, timings
+
+
+async def lookup_answer(
+        query: str,
+        workflow_id: UUID,
+        embeddings_model: str,
+        sys_prompt: Optional[str],
+        model: str,
+        temperature: float,
+        search: bool,
+        document_ids: Optional[List[UUID]] = None,
+        top_k: int = 4,
+) -> Tuple[Optional[Tuple[str, int]], Optional[List[float]], Optional[QueryRagOut]]:
+    """
+    Check the semantic answer cache. Returns (cache key, query vector, cached
+    answer); all None when the cache is disabled. The cache key is the config
+    key and workflow version the lookup used; hand it to `remember_answer`.
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None, None, None
+
+    started = time.perf_counter()
+    embeddings_model = embeddings_model or settings.DEFAUTL_EMBEDDINGS_MODEL
+    config_key = answer_config_key(
+        embeddings_model=embeddings_model,
+        sys_prompt=sys_prompt,
         model=model,
-        api_key=os.getenv("GOOGLE_API_KEY"),
         temperature=temperature,
-        max_retries=2,
+        search=search,
+        top_k=top_k,
+        document_ids=sorted(str(document_id) for document_id in document_ids) if document_ids else None,
+    )
+    # Same cached vector retrieval uses, so a miss costs no extra embedding call
+    vector = await asyncio.to_thread(
+        query_embedding_cache.get_or_compute,
+        embeddings_model,
+        query,
+        vector_store_registry.embeddings(embeddings_model).embed_query,
+    )
+
+    version, hit = answer_cache.lookup(workflow_id, config_key, vector)
+    if hit is None:
+        return (config_key, version), vector, None
+
+    entry, similarity = hit
+    return (config_key, version), vector, QueryRagOut(
+        **entry,
+        timings={"answer_cache": {
+            "hit": True,
+            "similarity": round(similarity, 4),
+            "seconds": round(time.perf_counter() - started, 4),
+        }},
     )
 
-    response_text = llm.invoke(formatted_prompt)
+
+def remember_answer(
+        workflow_id: UUID, cache_key: Optional[Tuple[str, int]], vector: Optional[List[float]], result: QueryRagOut
+):
+    if cache_key is None or vector is None:
+        return
+    config_key, version = cache_key
+    answer_cache.store(workflow_id, config_key, version, vector, {
+        "answer": result.answer,
+        "used_web": result.used_web,
+        "sources": result.sources.model_dump(),
+    })
+
+
+async def query_from_rag(
+        query: str,
+        workflow_id: UUID,
+        top_k: int = 4,
+        search: bool = False,
+        embeddings_model: str = settings.DEFAUTL_EMBEDDINGS_MODEL,
+        sys_prompt: Optional[str] = None,
+        model: str = "gemini-2.5-pro",
+        temperature: float = 0.7,
+        document_ids: Optional[List[UUID]] = None,
+) -> QueryRagOut:
+    cache_key, query_vector, cached = await lookup_answer(
+        query, workflow_id, embeddings_model,
+        sys_prompt=sys_prompt, model=model, temperature=temperature, search=search,
+        document_ids=document_ids, top_k=top_k,
+    )
+    if cached is not None:
+        return cached
+
+    formatted_prompt, rag_context, web_results, timings = await prepare_rag_prompt(
+        query=query,
+        workflow_id=workflow_id,
+        top_k=top_k,
+        search=search,
+        embeddings_model=embeddings_model,
+        sys_prompt=sys_prompt,
+        document_ids=document_ids,
+        model=model,
+    )
+
+    llm = chat_model(model, temperature)
+
+    llm_started = time.perf_counter()
+    response_text = await llm.ainvoke(formatted_prompt)
+    timings["llm_seconds"] = round(time.perf_counter() - llm_started, 4)
     final_answer = extract_llm_text(response_text.content)
 
     pprint("📝 RESPONSE 📝")
     pprint(response_text.content)
 
-    return QueryRagOut(
+    result = QueryRagOut(
         answer=str(final_answer),
-        used_web=search,
+        used_web=web_results is not None,
         sources=SourcesDict(
             rag=rag_context,
-            web=web_results if search else None,
-        )
-    )
\ No newline at end of file
+            web=web_results,
+        ),
+        timings=timings,
+    )
+    remember_answer(workflow_id, cache_key, query_vector, result)
+    return result
\ No newline at end of file
@@ -1,61 +1,134 @@
+import asyncio
 import traceback
 from pprint import pprint
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from supabase import Client
+from supabase import AsyncClient
 
-from app.dao.documents_dao import DocumentsDAO
-from app.dao.workflows_dao import WorkflowsDao
+from app.clients.local_index import local_index
+from app.clients.vector_store import embedding_space
+from app.dao.workflows_dao import AsyncWorkflowsDao
 from app.schemas.chat import ChatSessionCreate, ChatMessageCreate
 from app.schemas.document import DocumentOut
-from app.schemas.workflow import WorkflowOut, WorkflowCreate, WorkflowUpdate
+from app.schemas.workflow import WorkflowOut, WorkflowCreate, WorkflowUpdate, Definition
 from app.services.chat_service import ChatService
 from app.services.documet_service import DocumentService
+from app.services.llm_service import remove_workflow_chunks
+from app.utils.answer_cache import answer_cache
+from app.utils.pubsub import status_hub, workflow_topic
 
 
 class WorkflowService:
-    def __init__(self, client: Client):
-        self.dao = WorkflowsDao(client)
+    def __init__(self, client: AsyncClient):
+        self.dao = AsyncWorkflowsDao(client)
         self.document_service = DocumentService(client)
         self.chat_service = ChatService(client)
 
-    def list_workflows(self):
-        workflows = self.dao.list_workflows()
+    async def list_workflows(self):
+        workflows = await self.dao.list_workflows()
         return [WorkflowOut(**workflow) for workflow in workflows]
 
-    def get_workflow(self, workflow_id: UUID):
-        return self.dao.get_workflow(workflow_id)
+    async def get_workflow(self, workflow_id: UUID):
+        return await self.dao.get_workflow(workflow_id)
 
-    def create_workflow(self, payload: WorkflowCreate) -> WorkflowOut:
-        workflow = self.dao.create_workflow(
+    async def create_workflow(self, payload: WorkflowCreate) -> WorkflowOut:
+        workflow = await self.dao.create_workflow(
             name=payload.name,
             description=payload.description,
         )
         return WorkflowOut(**workflow)
 
-    def update_workflow(
+    async def update_workflow(
             self, workflow_id: UUID, payload: WorkflowUpdate
     ) -> WorkflowOut:
-        workflow = self.dao.update_workflow(
+        reset = None
+        if payload.definition is not None:
+            reset = await self._embeddings_reset_due(workflow_id, payload.definition)
+        if reset:
+            # Execution skips completed workflows; pending makes the next run re-ingest
+            payload = payload.model_copy(update={"status": payload.status or "pending"})
+
+        workflow = await self.dao.update_workflow(
             workflow_id=workflow_id,
             name=payload.name,
             description=payload.description,
             definition=payload.definition,
             status=payload.status,
         )
+        if reset:
+            # Only once the new definition is saved: a failed update must leave the old index intact
+            await self._reset_embeddings(workflow_id, payload.definition, *reset)
+        if payload.status:
+            status_hub.publish(
+                workflow_topic(workflow_id),
+                {"type": "workflow_status", "workflow_id": str(workflow_id), "status": payload.status},
+            )
+        if payload.definition is not None:
+            answer_cache.invalidate(workflow_id)
         return WorkflowOut(**workflow)
 
-    def delete_workflow(self, workflow_id: UUID) -> bool:
-        return self.dao.delete_workflow(workflow_id)
+    async def _embeddings_reset_due(
+            self, workflow_id: UUID, definition: Definition
+    ) -> Optional[Tuple[str, List[DocumentOut]]]:
+        """
+        Vectors from different embedding models or sizes can't be searched
+        together. When the definition switches either, returns the old
+        embedding space and the documents indexed in it, which must be
+        re-ingested; None when no re-index is due. Refused while ingestion
+        is running.
+        """
+        current = await self.dao.get_workflow(workflow_id)
+        if not current or not current.get("definition"):
+            return None
+        previous = Definition(**current["definition"])
+        old_space = embedding_space(previous.embeddingModel, previous.embeddingDimension)
+        if old_space == embedding_space(definition.embeddingModel, definition.embeddingDimension):
+            return None
 
-    def validate_workflow(self, workflow_id: UUID) -> None:
+        documents = await self.document_service.list_documents_by_workflow(workflow_id)
+        if current.get("status") == "in_progress" or any(document.status == "in_progress" for document in documents):
+            raise ValueError("The embedding model or dimension can't change while documents are being ingested")
+        indexed = [document for document in documents if document.status != "pending"]
+        if not indexed:
+            return None
+        return old_space, indexed
+
+    async def _reset_embeddings(
+            self, workflow_id: UUID, definition: Definition, old_space: str, indexed: List[DocumentOut]
+    ) -> None:
+        """
+        Send the documents back to pending so the next execution re-ingests
+        them, then remove the vectors left in the old space. Retrieval already
+        searches the new space, so a failed removal only leaves dead vectors.
+        """
+        local_index.drop(workflow_id)
+        for document in indexed:
+            await self.document_service.update_document_status(document.id, "pending")
+        try:
+            removed = await asyncio.to_thread(remove_workflow_chunks, workflow_id, old_space)
+        except Exception as e:
+            print(f"[WorkflowService] Failed to remove workflow {workflow_id}'s {old_space} vectors: {e}")
+            removed = 0
+        print(
+            f"[WorkflowService] Workflow {workflow_id} embeddings changed ({old_space} -> "
+            f"{embedding_space(definition.embeddingModel, definition.embeddingDimension)}): "
+            f"removed {removed} chunks, {len(indexed)} documents queued for re-ingestion"
+        )
+
+    async def delete_workflow(self, workflow_id: UUID) -> bool:
+        answer_cache.invalidate(workflow_id)
+        local_index.drop(workflow_id)
+        return await self.dao.delete_workflow(workflow_id)
+
+    async def validate_workflow(self, workflow_id: UUID) -> None:
         """
         Validates whether a workflow is executable.
         Raises HTTPException if invalid.
         """
 
-        workflow = self.dao.get_workflow(workflow_id)
+        workflow = await self.dao.get_workflow(workflow_id)
 
         if not workflow:
             raise HTTPException(
@@ -146,7 +219,7 @@ class WorkflowService:
             )
 
         # 5️⃣ Document existence check
-        documents = self.document_service.list_documents_by_workflow(workflow_id)
+        documents = await self.document_service.list_documents_by_workflow(workflow_id)
         if not documents:
             raise HTTPException(
                 status_code=400,
@@ -157,7 +230,7 @@ class WorkflowService:
         return None
 
     async def execute_workflow(self, workflow_id: UUID):
-        workflow_response = self.dao.get_workflow(workflow_id)
+        workflow_response = await self.dao.get_workflow(workflow_id)
         workflow = WorkflowOut(**workflow_response)
         pprint(workflow)
         if not workflow or not workflow.definition:
@@ -166,7 +239,9 @@ class WorkflowService:
             )
             return None
 
-        if workflow.status in ("in_progress", "completed"):
+        # The job queue runs at most one execution per workflow, so an "in_progress"
+        # status here is a previous attempt that died and is safe to resume.
+        if workflow.status == "completed":
             print(
                 f"[WorkflowService] Workflow {workflow_id} is already {workflow.status}"
             )
@@ -174,29 +249,31 @@ class WorkflowService:
 
         print(f"[WorkflowService] Executing workflow {workflow_id} ...")
 
-        self.update_workflow(workflow_id, payload=WorkflowUpdate(status="in_progress"))
+        await self.update_workflow(workflow_id, payload=WorkflowUpdate(status="in_progress"))
 
         print("[WorkflowService] Workflow {workflow_id} was updated")
 
         try:
-            document: DocumentOut = self.document_service.list_documents_by_workflow(workflow_id)[0]
-            if not document:
+            ingestion = await self.document_service.process_workflow_documents(
+                workflow_id=workflow_id,
+                embedding_model=embedding_space(
+                    workflow.definition.embeddingModel, workflow.definition.embeddingDimension
+                ),
+            )
+            if not ingestion["documents"]:
                 raise Exception("No document uploaded for this workflow")
-
-            if document.status == "processed":
-                print(f"[WorkflowService] Document {document.id} already processed.")
-                self.update_workflow(
-                    workflow_id=workflow_id,
-                    payload=WorkflowUpdate(status="completed"),
-                )
-                pprint("Document already processsed")
-            else:
-                self.document_service.process_and_store_document(document_id=document.id, workflow_id=workflow_id,
-                                                                 embedding_model=workflow.definition.embeddingModel)
+            print(
+                f"[WorkflowService] Documents: {len(ingestion['processed'])} processed, "
+                f"{ingestion['already_processed']} already processed, {len(ingestion['failed'])} failed"
+            )
+            if ingestion["failed"]:
+                # Processed documents are skipped when the job is retried
+                failed_ids = ", ".join(str(failed["document_id"]) for failed in ingestion["failed"])
+                raise Exception(f"Documents failed to process: {failed_ids}")
 
 
             # ASSISTANT RESPONSE
-            new_session = self.chat_service.create_session(
+            new_session = await self.chat_service.create_session(
                 payload=ChatSessionCreate(
                     workflow_id=workflow_id, name=str(workflow.definition.query)
                 )
@@ -209,14 +286,14 @@ class WorkflowService:
             )
 
             pprint("[WorkflowService] Processed chat message:", assistant_response)
-            self.update_workflow(
+            await self.update_workflow(
                 workflow_id=workflow_id,
                 payload=WorkflowUpdate(status="completed"),
             )
             return True
 
         except Exception as e:
-            # self.update_workflow(workflow_id, payload=WorkflowUpdate(status="failed"))
             print(f"[WorkflowService] Workflow {workflow_id} was not updated error: \n\n{traceback.format_exc()} ")
-
-        return True
+            await self.update_workflow(workflow_id, payload=WorkflowUpdate(status="failed"))
+            # Let the job queue record the error and retry
+            raise
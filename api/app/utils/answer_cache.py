@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+
+def answer_config_key(**config: Any) -> str:
+    """Stable digest of everything besides the question that shapes an answer (prompt, model, ...)."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class WorkflowVersions:
+    """
+    Per-workflow version counters in a SQLite file that every process on the
+    host shares. Bumping a workflow's version in one process (a document
+    finished processing in a job worker, the definition changed in another API
+    worker) is seen by the next lookup in all of them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing the module never touches the disk
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS workflow_versions (workflow_id TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+        return self._db
+
+    def get(self, workflow_id: str) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT version FROM workflow_versions WHERE workflow_id = ?", (workflow_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, workflow_id: str) -> None:
+        with self._lock:
+            self._connection().execute(
+                """
+                INSERT INTO workflow_versions (workflow_id, version) VALUES (?, 1)
+                ON CONFLICT(workflow_id) DO UPDATE SET version = version + 1
+                """,
+                (workflow_id,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class _Bucket:
+    """Cached answers for one (workflow, config, version): unit vectors stacked in one matrix."""
+
+    def __init__(self, dimension: int):
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+        self.created_at = np.empty(0, dtype=np.float64)
+        self.last_used = np.empty(0, dtype=np.float64)
+        self.entries: List[Dict[str, Any]] = []
+
+    def drop(self, keep: np.ndarray) -> int:
+        dropped = int(len(keep) - keep.sum())
+        if dropped:
+            self.vectors = self.vectors[keep]
+            self.created_at = self.created_at[keep]
+            self.last_used = self.last_used[keep]
+            self.entries = [entry for entry, kept in zip(self.entries, keep) if kept]
+        return dropped
+
+
+class SemanticAnswerCache:
+    """
+    Answers reused for near-identical questions within a workflow.
+
+    A lookup is one matrix-vector product over the bucket for the workflow's
+    current version and answer config; the best match above `threshold`
+    cosine similarity wins. Entries expire after `ttl` seconds and each bucket
+    keeps at most `max_entries`, least recently used evicted first.
+    `invalidate` bumps the workflow's shared version, so answers built from an
+    older definition or document set can never match again in any process.
+    `lookup` returns the version it read and `store` files the answer under
+    it, so an answer generated across an invalidation is never saved as fresh.
+    """
+
+    def __init__(
+            self,
+            versions: WorkflowVersions,
+            threshold: float = 0.95,
+            ttl: float = 3600.0,
+            max_entries: int = 512,
+            max_buckets: int = 1024,
+    ):
+        self.versions = versions
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str, int], _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "expired": 0, "evictions": 0, "invalidations": 0,
+                       "stale_skipped": 0}
+
+    @staticmethod
+    def _bucket_key(workflow_id: Any, config_key: str, version: int) -> Tuple[str, str, int]:
+        return str(workflow_id), config_key, version
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _expire(self, bucket: _Bucket, now: float) -> None:
+        self._stats["expired"] += bucket.drop(bucket.created_at > now - self.ttl)
+
+    def lookup(
+            self, workflow_id: Any, config_key: str, vector: List[float]
+    ) -> Tuple[int, Optional[Tuple[Dict[str, Any], float]]]:
+        """
+        (version, hit): the workflow version the lookup used, to pass on to
+        `store`, and (cached entry, similarity) of the closest fresh answer
+        above the threshold, or None.
+        """
+        query = self._unit(vector)
+        now = time.time()
+        version = self.versions.get(str(workflow_id))
+        key = self._bucket_key(workflow_id, config_key, version)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                self._buckets.move_to_end(key)
+                self._expire(bucket, now)
+            if bucket is None or not bucket.entries or bucket.vectors.shape[1] != query.shape[0]:
+                self._stats["misses"] += 1
+                return version, None
+
+            similarities = bucket.vectors @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._stats["misses"] += 1
+                return version, None
+
+            bucket.last_used[best] = now
+            self._stats["hits"] += 1
+            return version, (bucket.entries[best], similarity)
+
+    def store(
+            self, workflow_id: Any, config_key: str, version: int, vector: List[float], entry: Dict[str, Any]
+    ) -> None:
+        """Cache an answer generated against `version`, the one its `lookup` returned."""
+        if self.versions.get(str(workflow_id)) != version:
+            # Invalidated while the answer was being generated: it may be built on stale data
+            with self._lock:
+                self._stats["stale_skipped"] += 1
+            return
+        row = self._unit(vector)
+        now = time.time()
+        key = self._bucket_key(workflow_id, config_key, version)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.vectors.shape[1] != row.shape[0]:
+                bucket = self._buckets[key] = _Bucket(row.shape[0])
+            self._buckets.move_to_end(key)
+            self._expire(bucket, now)
+
+            if len(bucket.entries) >= self.max_entries:
+                keep = np.ones(len(bucket.entries), dtype=bool)
+                keep[np.argsort(bucket.last_used)[:len(bucket.entries) - self.max_entries + 1]] = False
+                self._stats["evictions"] += bucket.drop(keep)
+
+            bucket.vectors = np.vstack([bucket.vectors, row[None, :]])
+            bucket.created_at = np.append(bucket.created_at, now)
+            bucket.last_used = np.append(bucket.last_used, now)
+            bucket.entries.append(entry)
+            self._stats["stored"] += 1
+
+            while len(self._buckets) > self.max_buckets:
+                _key, evicted = self._buckets.popitem(last=False)
+                self._stats["evictions"] += len(evicted.entries)
+
+    def invalidate(self, workflow_id: Any) -> None:
+        """Forget every answer for the workflow, e.g. after its documents or definition changed."""
+        workflow_id = str(workflow_id)
+        self.versions.bump(workflow_id)
+        with self._lock:
+            for key in [key for key in self._buckets if key[0] == workflow_id]:
+                del self._buckets[key]
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "buckets": len(self._buckets),
+                "entries": sum(len(bucket.entries) for bucket in self._buckets.values()),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "enabled": settings.ANSWER_CACHE_ENABLED,
+            }
+
+    def close(self) -> None:
+        self.versions.close()
+
+
+answer_cache = SemanticAnswerCache(
+    WorkflowVersions(settings.ANSWER_CACHE_VERSIONS_PATH),
+    threshold=settings.ANSWER_CACHE_THRESHOLD,
+    ttl=settings.ANSWER_CACHE_TTL,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    max_buckets=settings.ANSWER_CACHE_MAX_BUCKETS,
+)
@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Dict, Any
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take `tokens`, sleeping until they are available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_rate_limited(error: Exception) -> bool:
+    for attr in ("code", "status_code", "status"):
+        if getattr(error, attr, None) == 429:
+            return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "rate limit" in message.lower()
+
+
+class BatchEmbedder:
+    """
+    Embeds documents in fixed-size batches with a bounded number of batches in
+    flight, a shared token bucket per model, and full-jitter exponential backoff
+    on 429s. Every call returns per-batch timings for throughput tuning.
+    """
+
+    def __init__(
+            self,
+            model: str,
+            embed_fn: Callable[[List[str]], List[List[float]]],
+            batch_size: int = 100,
+            max_in_flight: int = 4,
+            requests_per_minute: float = 1500,
+            max_retries: int = 5,
+            backoff_base: float = 1.0,
+            backoff_max: float = 30.0,
+    ):
+        self.model = model
+        self.embed_fn = embed_fn
+        self.batch_size = max(1, int(batch_size))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        rate = requests_per_minute / 60.0
+        self.bucket = TokenBucket(rate=rate, capacity=max(1.0, min(float(max_in_flight), rate)))
+        # Shared by every ingestion of this model, so in-flight batches stay bounded process-wide
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_in_flight)), thread_name_prefix="embed"
+        )
+
+    def _embed_batch(self, index: int, texts: List[str]) -> Tuple[List[List[float]], Dict[str, Any]]:
+        started = time.perf_counter()
+        throttled = 0.0
+        attempts = 0
+        while True:
+            attempts += 1
+            throttled += self.bucket.acquire()
+            try:
+                vectors = self.embed_fn(texts)
+                break
+            except Exception as e:
+                if not is_rate_limited(e) or attempts > self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+                print(f"[BatchEmbedder] {self.model} batch {index} rate limited, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                throttled += delay
+
+        return vectors, {
+            "batch": index,
+            "size": len(texts),
+            "attempts": attempts,
+            "seconds": round(time.perf_counter() - started, 4),
+            "throttled_seconds": round(throttled, 4),
+        }
+
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], Dict[str, Any]]:
+        started = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        futures = [self._executor.submit(self._embed_batch, i, batch) for i, batch in enumerate(batches)]
+
+        vectors, timings = [], []
+        for future in futures:
+            batch_vectors, timing = future.result()
+            vectors.extend(batch_vectors)
+            timings.append(timing)
+
+        elapsed = time.perf_counter() - started
+        return vectors, {
+            "model": self.model,
+            "texts": len(texts),
+            "batch_size": self.batch_size,
+            "batches": timings,
+            "seconds": round(elapsed, 4),
+            "texts_per_second": round(len(texts) / elapsed, 2) if elapsed and texts else 0.0,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+# Overlaps shorter than this are treated as coincidence, not a shared split boundary
+MIN_TEXT_OVERLAP = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); only used for budgeting and reporting."""
+    return (len(text) + 3) // 4
+
+
+def context_token_budget(model: Optional[str]) -> int:
+    return settings.CONTEXT_TOKEN_BUDGETS.get(model or "", settings.CONTEXT_TOKEN_BUDGET)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+@dataclass
+class _Piece:
+    text: str
+    rank: int
+    group: Optional[Tuple[Any, Any]]
+    start: Optional[int] = None
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+def _text_overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right), max_overlap), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join(a: _Piece, b: _Piece, max_overlap: int) -> Optional[_Piece]:
+    """`a` and `b` as one piece if they overlap or touch on the same page, else None."""
+    if a.start is not None and b.start is not None:
+        first, second = (a, b) if a.start <= b.start else (b, a)
+        gap = second.start - first.end
+        if gap > 2:
+            return None
+        if gap > 0:
+            # The splitter strips the whitespace between adjacent chunks
+            text = first.text + "\n" + second.text
+        else:
+            text = (first.text + second.text[first.end - second.start:]) if second.end > first.end else first.text
+        return _Piece(text, min(a.rank, b.rank), a.group, first.start)
+
+    for first, second in ((a, b), (b, a)):
+        size = _text_overlap(first.text, second.text, max_overlap)
+        if size:
+            return _Piece(first.text + second.text[size:], min(a.rank, b.rank), a.group)
+    return None
+
+
+def _absorb(pieces: List[_Piece], piece: _Piece, max_overlap: int, report: Dict[str, Any]) -> None:
+    key = _normalize(piece.text)
+    if any(key in _normalize(other.text) for other in pieces):
+        report["duplicates"] += 1
+        return
+    for other in [other for other in pieces if _normalize(other.text) in key]:
+        pieces.remove(other)
+        piece.rank = min(piece.rank, other.rank)
+        report["duplicates"] += 1
+
+    if piece.group is not None:
+        for other in pieces:
+            if other.group != piece.group:
+                continue
+            joined = _join(other, piece, max_overlap)
+            if joined is not None:
+                pieces.remove(other)
+                report["merged"] += 1
+                # The merged piece may now bridge to a third one
+                _absorb(pieces, joined, max_overlap, report)
+                return
+
+    pieces.append(piece)
+
+
+def pack_chunks(
+        chunks: Iterable[Tuple[str, Dict[str, Any]]],
+        token_budget: int,
+        max_overlap: int = 200,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Merge overlapping or adjacent chunks of the same page, drop duplicates and
+    keep the best-ranked pieces that fit `token_budget`.
+
+    `chunks` are (text, metadata) in relevance order. Chunks are on the same
+    page when their document_id (or source) and page metadata match; they are
+    stitched by `start_index` when present, else by a shared prefix/suffix of
+    up to `max_overlap` characters. Returns (pieces, report).
+    """
+    report = {"chunks": 0, "duplicates": 0, "merged": 0, "dropped": 0, "truncated": 0, "raw_tokens": 0}
+    pieces: List[_Piece] = []
+    for rank, (text, chunk_metadata) in enumerate(chunks):
+        report["chunks"] += 1
+        report["raw_tokens"] += estimate_tokens(text)
+        text = text.strip()
+        if not text:
+            report["duplicates"] += 1
+            continue
+        owner = chunk_metadata.get("document_id") or chunk_metadata.get("source")
+        group = (owner, chunk_metadata.get("page")) if owner is not None else None
+        _absorb(pieces, _Piece(text, rank, group, chunk_metadata.get("start_index")), max_overlap, report)
+
+    pieces.sort(key=lambda piece: piece.rank)
+
+    packed, used = [], 0
+    separator_tokens = estimate_tokens(CHUNK_SEPARATOR)
+    for piece in pieces:
+        cost = estimate_tokens(piece.text) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(piece.text)
+            used += cost
+        elif not packed:
+            # Never send an empty context because the best piece alone is too long
+            packed.append(piece.text[:token_budget * 4])
+            used = token_budget
+            report["truncated"] += 1
+        else:
+            report["dropped"] += 1
+
+    report["pieces"] = len(packed)
+    report["packed_tokens"] = used
+    return packed, report
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import Optional, Union, BinaryIO
+
+import httpx
+
+from app.clients.http_client import async_http_client
+from app.core.config import settings
+
+_MD5_ETAG = re.compile(r'^"?([0-9a-fA-F]{32})"?$')
+
+
+class DownloadedFile:
+    """
+    A verified download. Small files live in `buffer` and never touch disk;
+    larger ones are spilled to a uniquely named file at `path`.
+    """
+
+    def __init__(self, name: str, size: int, sha256: str,
+                 buffer: Optional[io.BytesIO] = None, path: Optional[str] = None):
+        self.name = name
+        self.size = size
+        self.sha256 = sha256
+        self.buffer = buffer
+        self.path = path
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    @property
+    def source(self) -> Union[str, BinaryIO]:
+        """What PdfReader should open: the temp file path or the in-memory buffer."""
+        if self.path is not None:
+            return self.path
+        self.buffer.seek(0)
+        return self.buffer
+
+    def cleanup(self) -> None:
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+def _download_client() -> httpx.AsyncClient:
+    return async_http_client(
+        "downloads",
+        timeout=httpx.Timeout(settings.DOWNLOAD_TIMEOUT, connect=settings.DOWNLOAD_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.DOWNLOAD_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DOWNLOAD_POOL_MAX_KEEPALIVE,
+        ),
+        follow_redirects=True,
+    )
+
+
+def _verify(headers: httpx.Headers, size: int, md5: str, sha256: str, expected_sha256: Optional[str]) -> None:
+    # Content-Length describes the encoded body, so only compare it when the body wasn't compressed
+    content_length = headers.get("content-length")
+    if content_length and headers.get("content-encoding", "identity") == "identity" and int(content_length) != size:
+        raise ValueError(f"Download truncated: expected {content_length} bytes, got {size}")
+
+    content_md5 = headers.get("content-md5")
+    if content_md5:
+        try:
+            expected_md5 = base64.b64decode(content_md5).hex()
+        except (binascii.Error, ValueError):
+            expected_md5 = None
+        if expected_md5 and expected_md5 != md5:
+            raise ValueError("Download checksum mismatch (Content-MD5)")
+
+    # Storage ETags of single-part uploads are the object's MD5; weak or multipart ETags are skipped
+    etag = _MD5_ETAG.match(headers.get("etag", ""))
+    if etag and etag.group(1).lower() != md5:
+        raise ValueError("Download checksum mismatch (ETag)")
+
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        raise ValueError("Download checksum mismatch (sha256)")
+
+
+async def download_file(url: str, name: str, expected_sha256: Optional[str] = None) -> DownloadedFile:
+    """
+    Stream `url` over the shared connection pool, hashing as it goes.
+    Size and checksums are verified before returning; on any failure the
+    partial download is removed.
+    """
+    buffer: Optional[io.BytesIO] = io.BytesIO()
+    spill: Optional[BinaryIO] = None
+    path: Optional[str] = None
+    size = 0
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+
+    try:
+        async with _download_client().stream("GET", url) as response:
+            if response.status_code != 200:
+                raise ValueError(f"Failed to download document (HTTP {response.status_code})")
+
+            async for chunk in response.aiter_bytes(settings.DOWNLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > settings.DOWNLOAD_MAX_BYTES:
+                    raise ValueError(f"Document exceeds {settings.DOWNLOAD_MAX_BYTES} bytes")
+                md5.update(chunk)
+                sha256.update(chunk)
+
+                if spill is None and size > settings.DOWNLOAD_SPOOL_MAX_BYTES:
+                    os.makedirs(settings.TEMP_DIR, exist_ok=True)
+                    # mkstemp picks a fresh name, so concurrent downloads of the same file can't collide
+                    fd, path = tempfile.mkstemp(
+                        prefix="download-", suffix=os.path.splitext(name)[1], dir=settings.TEMP_DIR
+                    )
+                    spill = os.fdopen(fd, "wb")
+                    spill.write(buffer.getbuffer())
+                    buffer.close()
+                    buffer = None
+
+                (spill or buffer).write(chunk)
+
+            headers = response.headers
+
+        if spill is not None:
+            spill.close()
+            spill = None
+
+        _verify(headers, size, md5.hexdigest(), sha256.hexdigest(), expected_sha256)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+        DownloadedFile(name, size, sha256.hexdigest(), buffer=buffer, path=path).cleanup()
+        raise
+
+    return DownloadedFile(name, size, sha256.hexdigest(), buffer=buffer, path=path)
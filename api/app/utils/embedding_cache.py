@@ -0,0 +1,265 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from app.core.config import settings
+
+
+def chunk_content_hash(model: str, text: str) -> str:
+    """Content address of a chunk's vector: same text + same model => same vector."""
+    return hashlib.sha256(f"{model}\x00{text}".encode()).hexdigest()
+
+
+def normalize_query(text: str) -> str:
+    """Case and whitespace differences should not cost an embedding call."""
+    return " ".join(text.casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query embeddings keyed by (model, normalized query).
+
+    Tier 1 is an in-memory LRU holding float32 arrays (4 bytes per dimension
+    rather than a boxed Python float each). Tier 2 is an optional SQLite file
+    that survives restarts and is trimmed to `max_disk_bytes`, least recently
+    used first.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 2048,
+            disk_path: Optional[str] = None,
+            max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0, "disk_evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        # Running total of the disk tier's vector bytes, so inserts never re-sum the table
+        self._disk_bytes = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings(last_used)")
+        self._db.commit()
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM query_embeddings").fetchone()[0]
+
+    @staticmethod
+    def _disk_key(key: Tuple[str, str]) -> str:
+        return hashlib.sha256(f"{key[0]}\x00{key[1]}".encode()).hexdigest()
+
+    def _remember(self, key: Tuple[str, str], vector: array) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def _read_disk(self, key: Tuple[str, str]) -> Optional[array]:
+        if self._db is None:
+            return None
+        disk_key = self._disk_key(key)
+        row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (disk_key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), disk_key))
+        self._db.commit()
+        return array("f", row[0])
+
+    def _write_disk(self, key: Tuple[str, str], vector: array) -> None:
+        if self._db is None:
+            return
+        disk_key = self._disk_key(key)
+        blob = vector.tobytes()
+        # Two concurrent misses on one query both write it; don't count the replaced row twice
+        replaced = self._db.execute("SELECT size FROM query_embeddings WHERE key = ?", (disk_key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)",
+            (disk_key, blob, len(blob), time.time()),
+        )
+        self._disk_bytes += len(blob) - (replaced[0] if replaced else 0)
+        while self._disk_bytes > self.max_disk_bytes:
+            oldest = self._db.execute(
+                "SELECT key, size FROM query_embeddings ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            self._db.execute("DELETE FROM query_embeddings WHERE key = ?", (oldest[0],))
+            self._disk_bytes -= oldest[1]
+            self._stats["disk_evictions"] += 1
+        self._db.commit()
+
+    def get_or_compute(self, model: str, query: str, compute: Callable[[str], List[float]]) -> List[float]:
+        key = (model, normalize_query(query))
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vector.tolist()
+
+            vector = self._read_disk(key)
+            if vector is not None:
+                self._stats["disk_hits"] += 1
+                self._remember(key, vector)
+                return vector.tolist()
+
+            self._stats["misses"] += 1
+
+        # Embed outside the lock so one slow API call doesn't serialise every lookup
+        computed = list(compute(query))
+        vector = array("f", computed)
+
+        with self._lock:
+            self._remember(key, vector)
+            self._write_disk(key, vector)
+        return computed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._memory),
+                "memory_bytes": sum(vector.itemsize * len(vector) for vector in self._memory.values()),
+                "disk_bytes": self._disk_bytes,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class ChunkEmbeddingStore:
+    """
+    Persistent content-addressed store of document chunk vectors.
+    Re-uploading a PDF, or uploading it to another workflow, reuses the vectors
+    instead of calling the embedding API again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats = {"embedded": 0, "reused": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing the module never touches the disk
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunk_embeddings (
+                    content_hash TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+        return self._db
+
+    def get_many(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            db = self._connection()
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = db.execute(
+                    f"SELECT content_hash, vector FROM chunk_embeddings WHERE content_hash IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                found.update({content_hash: array("f", vector).tolist() for content_hash, vector in rows})
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        with self._lock:
+            db = self._connection()
+            db.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (content_hash, model, vector) VALUES (?, ?, ?)",
+                [(content_hash, model, array("f", vector).tobytes()) for content_hash, vector in vectors.items()],
+            )
+            db.commit()
+
+    def embed(
+            self,
+            model: str,
+            texts: List[str],
+            compute: Callable[[List[str]], List[List[float]]],
+    ) -> Tuple[List[str], List[List[float]], int]:
+        """
+        Vectors for `texts`, computing only hashes never seen before.
+        Returns (content hashes, vectors, number of texts actually embedded).
+        """
+        hashes = [chunk_content_hash(model, text) for text in texts]
+        known = self.get_many(list(set(hashes)))
+
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in known:
+                missing.setdefault(content_hash, text)
+
+        if missing:
+            computed = compute(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), (list(vector) for vector in computed)))
+            self.put_many(model, new_vectors)
+            known.update(new_vectors)
+
+        with self._lock:
+            self._stats["embedded"] += len(missing)
+            self._stats["reused"] += len(texts) - len(missing)
+        return hashes, [known[content_hash] for content_hash in hashes], len(missing)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    disk_path=settings.QUERY_EMBEDDING_CACHE_PATH,
+    max_disk_bytes=settings.QUERY_EMBEDDING_CACHE_MAX_BYTES,
+)
+
+chunk_embedding_store = ChunkEmbeddingStore(settings.CHUNK_EMBEDDING_STORE_PATH)
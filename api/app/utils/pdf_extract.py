@@ -0,0 +1,154 @@
+"""
+PDF text extraction that can run in worker processes.
+
+Kept free of app imports so spawned workers only pay for importing pypdf.
+"""
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Executor
+from typing import Iterator, List, Tuple, Dict, Any, Optional, Union, BinaryIO
+
+from pypdf import PdfReader
+
+PageText = Tuple[int, str, Dict[str, Any]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def _reader(source: Union[str, bytes]) -> PdfReader:
+    return PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def page_count(file_path: Union[str, bytes]) -> int:
+    return len(_reader(file_path).pages)
+
+
+def _page_text(reader: PdfReader, labels: List[str], source_name: str, number: int, total: int) -> PageText:
+    return (
+        number,
+        reader.pages[number].extract_text(),
+        # Same metadata PyPDFLoader sets
+        {
+            "source": source_name,
+            "total_pages": total,
+            "page": number,
+            "page_label": labels[number] if number < len(labels) else str(number + 1),
+        },
+    )
+
+
+def extract_page_range(
+        file_path: Union[str, bytes], start: int, stop: int, source_name: Optional[str] = None
+) -> List[PageText]:
+    """Text of pages [start, stop) of a file path or the PDF's bytes."""
+    reader = _reader(file_path)
+    total = len(reader.pages)
+    # page_labels is rebuilt on every access, so read it once
+    labels = reader.page_labels
+    source_name = source_name or (file_path if isinstance(file_path, str) else "document.pdf")
+    return [_page_text(reader, labels, source_name, number, total) for number in range(start, min(stop, total))]
+
+
+def extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide extraction pool, recreated if the worker count changes."""
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: the API process runs threads, which fork does not copy safely
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def iter_page_texts(
+        file_path: Union[str, BinaryIO],
+        executor: Optional[Executor] = None,
+        pages_per_task: int = 8,
+        max_pending: Optional[int] = None,
+        source_name: Optional[str] = None,
+) -> Iterator[PageText]:
+    """
+    Yield (page, text, metadata) in page order. With an executor, page ranges
+    are extracted in parallel; at most `max_pending` ranges (default 8, pass
+    about twice the worker count) are outstanding so memory stays bounded on
+    very large files.
+
+    `file_path` may also be an open binary stream. Without an executor it is
+    parsed in-process; with one it is written once to a temp file and the
+    workers open that path, so the PDF isn't re-pickled for every range.
+    """
+    if source_name is None:
+        source_name = file_path if isinstance(file_path, str) else "document.pdf"
+
+    if executor is None:
+        reader = PdfReader(file_path)
+        total = len(reader.pages)
+        labels = reader.page_labels
+        for number in range(total):
+            yield _page_text(reader, labels, source_name, number, total)
+        return
+
+    # Streams can't be handed to another process; workers get a path instead
+    spilled = None if isinstance(file_path, str) else _spill_to_file(file_path)
+    source = spilled or file_path
+    pending = deque()
+
+    try:
+        total = page_count(source)
+        ranges = iter(range(0, total, pages_per_task))
+        max_pending = max_pending or 8
+
+        for start in ranges:
+            pending.append(executor.submit(extract_page_range, source, start, start + pages_per_task, source_name))
+            if len(pending) >= max_pending:
+                break
+
+        while pending:
+            results = pending.popleft().result()
+            next_start = next(ranges, None)
+            if next_start is not None:
+                pending.append(
+                    executor.submit(extract_page_range, source, next_start, next_start + pages_per_task, source_name)
+                )
+            yield from results
+    finally:
+        # Closed early (ingestion failed): don't leave queued ranges for the workers
+        for future in pending:
+            future.cancel()
+        if spilled is not None:
+            # A range still running may lose the file; nobody reads its result any more
+            _remove_quietly(spilled)
+
+
+def _spill_to_file(stream: BinaryIO) -> str:
+    with tempfile.NamedTemporaryFile(prefix="pdf-extract-", suffix=".pdf", delete=False) as out:
+        if isinstance(stream, io.BytesIO):
+            out.write(stream.getbuffer())
+        else:
+            stream.seek(0)
+            shutil.copyfileobj(stream, out)
+        return out.name
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.prompts.chat import ChatPromptTemplate
+
+from app.core.config import settings, metadata
+
+# Slots for base prompts that don't place the context and question themselves
+CONTEXT_SUFFIX = "\n\nContext:\n{context}\n\nQuestion: {question}"
+
+TemplateKey = Tuple[str, str, bool]
+
+
+def base_system_prompt(search: bool) -> str:
+    return metadata.RAG_WITH_WEB_SYSTEM_PROMPT if search else metadata.general_system_prompt
+
+
+def _literal(text: str) -> str:
+    """Escape braces so workflow prompts are taken verbatim rather than as template variables."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class PromptTemplateCache:
+    """
+    Compiled RAG prompt templates keyed by (base prompt, workflow prompt, search flag).
+
+    The base prompts already carry the context and question slots, so the
+    workflow's prompt follows them and no second context block is appended.
+    The key is the prompt text itself: an edited workflow prompt compiles a
+    new template and the old one ages out of the LRU, so nothing needs
+    invalidating, and workflows with the same prompt share one template.
+    """
+
+    def __init__(self, max_templates: int = 1024):
+        self.max_templates = max_templates
+        self._templates: "OrderedDict[TemplateKey, ChatPromptTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "compiled": 0, "evicted": 0}
+
+    def get(self, sys_prompt: Optional[str], search: bool) -> ChatPromptTemplate:
+        base = base_system_prompt(search)
+        key = (base, sys_prompt or "", search)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self._stats["hits"] += 1
+                return template
+
+            text = base + "\n\n" + _literal(sys_prompt) if sys_prompt else base
+            if "{context}" not in base:
+                text += CONTEXT_SUFFIX
+            template = ChatPromptTemplate.from_template(text)
+            self._templates[key] = template
+            self._stats["compiled"] += 1
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+                self._stats["evicted"] += 1
+            return template
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"templates": len(self._templates), **self._stats}
+
+
+prompt_templates = PromptTemplateCache(max_templates=settings.PROMPT_TEMPLATE_CACHE_SIZE)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+
+
+def workflow_topic(workflow_id: Any) -> str:
+    return f"workflow:{workflow_id}"
+
+
+def session_topic(session_id: Any) -> str:
+    return f"session:{session_id}"
+
+
+class Subscription:
+    """One subscriber's bounded mailbox. A slow reader loses its oldest events, never blocks publishers."""
+
+    def __init__(self, hub: "StatusHub", topic: str, max_queue: int):
+        self.hub = hub
+        self.topic = topic
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class StatusHub:
+    """
+    In-process pub/sub for status transitions, keyed by topic. The latest
+    event per topic is retained so a new subscriber learns the current state
+    without reading the database.
+
+    Subscribers and deliveries live on the event loop; `publish` may be called
+    from worker threads and hops onto the loop. Events only reach subscribers
+    connected to the same process.
+    """
+
+    def __init__(self, max_queue: int = 100, max_retained: int = 10_000):
+        self.max_queue = max_queue
+        self.max_retained = max_retained
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._retained: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"published": 0, "delivered": 0}
+
+    def subscribe(self, topic: str) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, topic, self.max_queue)
+        self._topics.setdefault(topic, set()).add(subscription)
+        retained = self._retained.get(topic)
+        if retained is not None:
+            subscription._deliver(retained)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._topics.get(subscription.topic)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._topics[subscription.topic]
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> None:
+        event = {**event, "topic": topic, "at": time.time()}
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._loop is not None and running is not self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._publish, topic, event)
+        else:
+            self._publish(topic, event)
+
+    def _publish(self, topic: str, event: Dict[str, Any]) -> None:
+        self._retained[topic] = event
+        self._retained.move_to_end(topic)
+        while len(self._retained) > self.max_retained:
+            self._retained.popitem(last=False)
+
+        self._stats["published"] += 1
+        for subscription in self._topics.get(topic, ()):
+            subscription._deliver(event)
+            self._stats["delivered"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "topics": len(self._topics),
+            "subscribers": sum(len(subscribers) for subscribers in self._topics.values()),
+            "retained": len(self._retained),
+        }
+
+
+status_hub = StatusHub(max_queue=settings.STATUS_HUB_QUEUE_SIZE, max_retained=settings.STATUS_HUB_MAX_RETAINED)
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+SearchKey = Tuple[str, ...]
+
+
+class SearchCache:
+    """
+    TTL cache for web search results with request coalescing.
+
+    Tier 1 is a size-bounded in-memory LRU, tier 2 an optional SQLite file
+    that survives restarts. Concurrent lookups of the same key share one
+    outbound call; that call runs as its own task, so a caller timing out
+    doesn't cancel it for the others and its result is still cached.
+    Only successful results are cached. Lives on the event loop thread.
+    """
+
+    def __init__(
+            self,
+            ttl: float = 900.0,
+            max_entries: int = 1024,
+            disk_path: Optional[str] = None,
+            max_disk_entries: int = 100_000,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[SearchKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[SearchKey, asyncio.Task] = {}
+        self._stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0,
+            "expired": 0, "evictions": 0, "errors": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_search_results_expires ON search_results(expires_at)")
+        self._db.commit()
+
+    @staticmethod
+    def _disk_key(key: SearchKey) -> str:
+        return hashlib.sha256("\x00".join(key).encode()).hexdigest()
+
+    def _lookup(self, key: SearchKey) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            self._stats["expired"] += 1
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM search_results WHERE key = ?", (self._disk_key(key),)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self._stats["disk_hits"] += 1
+                return value
+
+        return None
+
+    def _remember(self, key: SearchKey, value: Dict[str, Any], expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _store(self, key: SearchKey, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO search_results (key, value, expires_at) VALUES (?, ?, ?)",
+            (self._disk_key(key), json.dumps(value, default=str), expires_at),
+        )
+        self._db.execute("DELETE FROM search_results WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            """
+            DELETE FROM search_results WHERE key IN (
+                SELECT key FROM search_results ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,),
+        )
+        self._db.commit()
+
+    async def _fetch_and_store(self, key: SearchKey, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        try:
+            value = await fetch()
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._store(key, value)
+        return value
+
+    async def get_or_fetch(self, key: SearchKey, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+            task = asyncio.create_task(self._fetch_and_store(key, fetch))
+            # Mark failures as seen even if every caller gave up waiting
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["coalesced"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            **self._stats,
+            "entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+search_cache = SearchCache(
+    ttl=settings.WEB_SEARCH_CACHE_TTL,
+    max_entries=settings.WEB_SEARCH_CACHE_SIZE,
+    disk_path=settings.WEB_SEARCH_CACHE_PATH,
+)
@@ -0,0 +1,45 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+from pydantic import BaseModel
+
+from app.utils.pubsub import StatusHub
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop nginx from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def format_sse(event: str, data: Any) -> str:
+    payload = json.dumps(data, default=_jsonable)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Turn {"event", "data"} dicts into text/event-stream frames."""
+    async for item in events:
+        yield format_sse(item["event"], item["data"])
+
+
+async def subscription_stream(hub: StatusHub, topic: str, keepalive: float) -> AsyncIterator[str]:
+    """
+    Forward a hub topic as SSE frames until the client goes away. A comment
+    line goes out after `keepalive` idle seconds so proxies don't drop the
+    connection.
+    """
+    with hub.subscribe(topic) as subscription:
+        while True:
+            event = await subscription.get(timeout=keepalive)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event["type"], event)
@@ -1,10 +1,16 @@
 
 
 from typing import List, Dict, Any, Optional
+import httpx
 from serpapi.google_search import GoogleSearch
 from dotenv import load_dotenv
 import os
 
+from app.clients.http_client import async_http_client
+from app.core.config import settings
+from app.utils.embedding_cache import normalize_query
+from app.utils.search_cache import search_cache
+
 load_dotenv()
 
 
@@ -104,19 +110,18 @@ def serialize_short_videos(short_videos: list, limit: int = 3) -> List[Dict[str,
     return results
 
 
-def search_internet(query: str) -> Dict[str, Any]:
-    params = {
+def search_params(query: str) -> Dict[str, Any]:
+    return {
         "q": query,
-        "location": "India",
-        "hl": "en",
-        "gl": "in",
+        "location": settings.WEB_SEARCH_LOCATION,
+        "hl": settings.WEB_SEARCH_HL,
+        "gl": settings.WEB_SEARCH_GL,
         "google_domain": "google.com",
         "api_key": os.getenv("SERPAPI_API_KEY"),
     }
 
-    search = GoogleSearch(params)
-    result = search.get_dict()
 
+def serialize_search(query: str, result: Dict[str, Any]) -> Dict[str, Any]:
     organic_results = result.get("organic_results", [])
     short_videos = result.get("short_videos", [])
 
@@ -130,3 +135,46 @@ def search_internet(query: str) -> Dict[str, Any]:
     }
 
 
+def search_internet(query: str) -> Dict[str, Any]:
+    search = GoogleSearch(search_params(query))
+    return serialize_search(query, search.get_dict())
+
+
+def _serpapi_client() -> httpx.AsyncClient:
+    return async_http_client(
+        "serpapi",
+        timeout=httpx.Timeout(
+            settings.SERPAPI_READ_TIMEOUT,
+            connect=settings.SERPAPI_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.SERPAPI_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SERPAPI_POOL_MAX_CONNECTIONS,
+        ),
+    )
+
+
+async def fetch_search(query: str) -> Dict[str, Any]:
+    """
+    Async SerpAPI call over a pooled connection with connect/read timeouts.
+    Same output as search_internet. HTTP errors raise (and so are never
+    cached); a 200 carrying an "error" such as "no results" is an empty result.
+    """
+    params = {"engine": "google", "output": "json", **search_params(query)}
+    response = await _serpapi_client().get(settings.SERPAPI_URL, params=params)
+    if response.status_code >= 400:
+        # httpx's own error would print the URL, api_key included
+        raise ValueError(f"SerpAPI returned HTTP {response.status_code}")
+    return serialize_search(query, response.json())
+
+
+async def asearch_internet(query: str) -> Dict[str, Any]:
+    """
+    search_internet through the result cache: repeated and concurrent
+    identical searches cost one SerpAPI call per WEB_SEARCH_CACHE_TTL.
+    """
+    params = search_params(query)
+    key = (normalize_query(query), params["location"], params["hl"], params["gl"])
+    result = await search_cache.get_or_fetch(key, lambda: fetch_search(query))
+    # The cache key is normalised; echo the query as this caller typed it
+    return {**result, "query": query}
@@ -0,0 +1,21 @@
+"""Latency helpers shared by the benchmarks."""
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+
+def percentiles(latencies: List[float]) -> Tuple[float, float]:
+    """p50 and p99 in milliseconds of latencies given in seconds."""
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return statistics.median(ordered) * 1000, p99 * 1000
+
+
+def measure(query_fn: Callable[[int], object], queries: int) -> Tuple[float, float]:
+    """Call `query_fn(q)` for q in range(queries), one at a time; returns (p50, p99) in ms."""
+    latencies = []
+    for q in range(queries):
+        started = time.perf_counter()
+        query_fn(q)
+        latencies.append(time.perf_counter() - started)
+    return percentiles(latencies)
@@ -0,0 +1,139 @@
+"""
+Local SerpAPI stand-in for testing web search latency and failures offline.
+
+    python -m benchmarks.fake_serpapi --port 8790 --latency 0.3 --jitter 0.1 --error-rate 0.05 --hang-rate 0.02
+
+Then run the API with SERPAPI_URL=http://127.0.0.1:8790/search.json, or use
+benchmarks.web_search, which starts one in-process.
+
+Responses follow SerpAPI's google engine shape (answer_box, organic_results,
+short_videos). --error-rate answers HTTP 500, --hang-rate sleeps past any
+sensible read timeout.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def fake_result(query: str) -> dict:
+    return {
+        "search_metadata": {"status": "Success"},
+        "search_parameters": {"engine": "google", "q": query},
+        "answer_box": {
+            "answer": f"Stand-in answer for {query!r}",
+            "title": "Fake SerpAPI",
+            "link": "https://example.com/answer",
+        },
+        "organic_results": [
+            {
+                "position": i + 1,
+                "title": f"Result {i + 1} for {query}",
+                "link": f"https://example.com/{i + 1}",
+                "snippet": f"Snippet {i + 1} about {query}.",
+                "source": "example.com",
+            }
+            for i in range(6)
+        ] + [
+            {
+                "position": 7,
+                "title": f"Video about {query}",
+                "link": "https://video.example.com/watch",
+                "video_link": "https://video.example.com/watch",
+                "thumbnail": "https://video.example.com/thumb.jpg",
+                "duration": "3:14",
+                "source": "video.example.com",
+            }
+        ],
+        "short_videos": [
+            {
+                "title": f"Short about {query}",
+                "link": "https://shorts.example.com/1",
+                "clip": "https://shorts.example.com/1.mp4",
+                "thumbnail": "https://shorts.example.com/1.jpg",
+                "duration": "0:30",
+                "source": "shorts.example.com",
+            }
+        ],
+    }
+
+
+class FakeSerpApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    hang_rate = 0.0
+    hang_seconds = 60.0
+    requests = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        with FakeSerpApiHandler._lock:
+            FakeSerpApiHandler.requests += 1
+
+        roll = random.random()
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if roll >= 1 - self.error_rate:
+            self._send(500, {"error": "Fake SerpAPI failure"})
+            return
+
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        if not query:
+            self._send(400, {"error": "Missing query `q` parameter."})
+            return
+        self._send(200, fake_result(query))
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 0, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+          hang_rate: float = 0.0, hang_seconds: float = 60.0) -> ThreadingHTTPServer:
+    """Start the stand-in on a daemon thread; port 0 picks a free one (see server.server_port)."""
+    handler = type("ConfiguredFakeSerpApi", (FakeSerpApiHandler,), {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "hang_rate": hang_rate,
+        "hang_seconds": hang_seconds,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.jitter, args.error_rate, args.hang_rate)
+    print(f"Fake SerpAPI on http://127.0.0.1:{server.server_port}/search.json")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-turn cost of building a chat model client versus taking it from the pool.
+
+    python -m benchmarks.llm_clients --turns 200 --threads 16
+
+No model is called: only client construction (channel and credential setup)
+is measured, so a placeholder GOOGLE_API_KEY is enough. The threaded run
+checks that concurrent turns for the same key end up sharing one client.
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.clients.llm_client import LLMClientPool
+
+
+def timed(fn, turns: int) -> list:
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<10} median {statistics.median(samples) * 1e6:9.1f} us  "
+        f"p95 {p95 * 1e6:9.1f} us  total {sum(samples) * 1e3:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    args = parser.parse_args()
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+    fresh = timed(
+        lambda: ChatGoogleGenerativeAI(
+            model=args.model, api_key=os.getenv("GOOGLE_API_KEY"), temperature=0.7, max_retries=2
+        ),
+        args.turns,
+    )
+    pool = LLMClientPool()
+    pool.get(args.model, 0.7)
+    pooled = timed(lambda: pool.get(args.model, 0.7), args.turns)
+
+    report("per turn", fresh)
+    report("pooled", pooled)
+    print(f"saved per turn: {(statistics.median(fresh) - statistics.median(pooled)) * 1e3:.2f} ms")
+
+    pool = LLMClientPool()
+    with ThreadPoolExecutor(args.threads) as executor:
+        clients = list(executor.map(lambda _i: pool.get(args.model, 0.7), range(args.turns)))
+    print(f"{args.threads} threads, {args.turns} turns -> {len({id(c) for c in clients})} client(s)", pool.stats())
+
+
+if __name__ == "__main__":
+    main()
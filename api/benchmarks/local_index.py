@@ -0,0 +1,99 @@
+"""
+Retrieval latency: Chroma collection query versus the memory-mapped local
+index (float32 and float16), for one workflow of growing size.
+
+Uses random vectors, so no embedding API calls:
+
+    python -m benchmarks.local_index --chunks 1000 10000 100000 1000000 --chroma-max 100000
+
+Chroma is skipped above --chroma-max chunks since populating it dominates
+the run. Also reports the local index's build and first-load time, and
+Chroma's recall@k against the exact top-k the local index returns.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from app.clients.local_index import LocalVectorIndex
+from benchmarks._timing import measure
+
+
+def batches(vectors: np.ndarray, documents: int, batch_size: int = 50_000):
+    for start in range(0, len(vectors), batch_size):
+        end = min(start + batch_size, len(vectors))
+        yield (
+            [f"chunk-{i}" for i in range(start, end)],
+            vectors[start:end],
+            [f"doc-{i % documents}" for i in range(start, end)],
+        )
+
+
+def run(chunks: int, dim: int, queries: int, top_k: int, documents: int, chroma_max: int):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((chunks, dim), dtype=np.float32)
+    probes = rng.standard_normal((queries, dim), dtype=np.float32)
+    line = f"{chunks:>8} chunks"
+
+    with tempfile.TemporaryDirectory() as path:
+        exact = {}
+        for dtype in ("float32", "float16"):
+            index = LocalVectorIndex(f"{path}/{dtype}", dtype=dtype)
+            built = index.write("bench", "wf", batches(vectors, documents))
+            started = time.perf_counter()
+            index.get("bench", "wf")
+            loaded = (time.perf_counter() - started) * 1000
+
+            results = {}
+
+            def search(q):
+                results[q] = index.search("bench", "wf", probes[q], top_k)
+
+            p50, p99 = measure(search, queries)
+            filtered_p50, _p99 = measure(
+                lambda q: index.search("bench", "wf", probes[q], top_k, document_ids=["doc-0"]), queries
+            )
+            if dtype == "float32":
+                exact = {q: {chunk_id for chunk_id, _score in hits} for q, hits in results.items()}
+            line += (
+                f"  |  local {dtype} build {built['seconds']:6.2f}s load {loaded:5.1f} ms "
+                f"p50 {p50:7.2f} ms p99 {p99:7.2f} ms (1-doc filter p50 {filtered_p50:6.2f} ms)"
+            )
+
+        if chunks <= chroma_max:
+            client = chromadb.PersistentClient(path=f"{path}/chroma")
+            collection = client.create_collection("workflow_bench", metadata={"hnsw:space": "cosine"})
+            for ids, batch, document_ids in batches(vectors, documents, batch_size=5000):
+                collection.add(ids=ids, embeddings=batch, metadatas=[{"document_id": d} for d in document_ids])
+
+            found = {}
+
+            def query(q):
+                found[q] = set(collection.query(query_embeddings=probes[q:q + 1], n_results=top_k)["ids"][0])
+
+            p50, p99 = measure(query, queries)
+            recall = statistics.mean(len(found[q] & exact[q]) / top_k for q in range(queries))
+            line += f"  |  chroma p50 {p50:7.2f} ms p99 {p99:7.2f} ms recall@{top_k} {recall:.2f}"
+
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--chroma-max", type=int, default=100000)
+    args = parser.parse_args()
+
+    for chunks in args.chunks:
+        run(chunks, args.dim, args.queries, args.top_k, args.documents, args.chroma_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+PDF text extraction throughput (pages/s) by worker count.
+
+    python -m benchmarks.pdf_extraction path/to/large.pdf --workers 0 1 2 4 8 [--in-memory]
+
+Worker count 0 parses in-process, which is what PDF_EXTRACT_WORKERS=0 does.
+--in-memory parses from a BytesIO, like downloads under DOWNLOAD_SPOOL_MAX_BYTES.
+"""
+import argparse
+import io
+import time
+
+from app.utils.pdf_extract import iter_page_texts, extraction_pool, shutdown_extraction_pool
+
+
+def run(pdf: str, workers: int, pages_per_task: int, in_memory: bool) -> None:
+    executor = extraction_pool(workers) if workers > 0 else None
+    if executor is not None:
+        # Spawn the workers before timing
+        list(executor.map(abs, range(workers)))
+
+    source = pdf
+    if in_memory:
+        with open(pdf, "rb") as f:
+            source = io.BytesIO(f.read())
+
+    started = time.perf_counter()
+    pages = 0
+    characters = 0
+    for _number, text, _metadata in iter_page_texts(
+            source, executor=executor, pages_per_task=pages_per_task, max_pending=2 * workers
+    ):
+        pages += 1
+        characters += len(text)
+    elapsed = time.perf_counter() - started
+
+    print(f"workers {workers:>2}  {pages} pages  {pages / elapsed:8.1f} pages/s  ({characters} chars, {elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--pages-per-task", type=int, default=8)
+    parser.add_argument("--in-memory", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        for workers in args.workers:
+            run(args.pdf, workers, args.pages_per_task, args.in_memory)
+    finally:
+        shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Local index quantization: first-pass bytes per vector, latency and recall@k
+of int8 and binary codes with full-precision rescoring, against the exact
+float32 scan.
+
+    python -m benchmarks.quantization --chunks 100000 --dim 3072 --rescore-factors 1 4 10 40
+
+Vectors are drawn around random cluster centres, which is closer to real
+embeddings than pure noise; queries are perturbed copies of stored rows.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.clients.local_index import LocalVectorIndex
+
+
+def clustered(rng, count: int, dim: int, clusters: int, spread: float) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    assignment = rng.integers(0, clusters, count)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, 50_000):
+        end = min(start + 50_000, count)
+        vectors[start:end] = centres[assignment[start:end]] + spread * rng.standard_normal((end - start, dim), dtype=np.float32)
+    return vectors
+
+
+def batches(vectors: np.ndarray, batch_size: int = 50_000):
+    for start in range(0, len(vectors), batch_size):
+        end = min(start + batch_size, len(vectors))
+        yield [f"chunk-{i}" for i in range(start, end)], vectors[start:end], ["doc"] * (end - start)
+
+
+def measure(index: LocalVectorIndex, probes: np.ndarray, top_k: int) -> tuple[float, list]:
+    latencies, results = [], []
+    for probe in probes:
+        started = time.perf_counter()
+        results.append({chunk_id for chunk_id, _score in index.search("bench", "wf", probe, top_k)})
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=0.5)
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4, 10, 40])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered(rng, args.chunks, args.dim, args.clusters, args.spread)
+    probes = vectors[rng.integers(0, args.chunks, args.queries)] + 0.3 * rng.standard_normal(
+        (args.queries, args.dim), dtype=np.float32
+    )
+
+    with tempfile.TemporaryDirectory() as path:
+        exact_index = LocalVectorIndex(f"{path}/none")
+        exact_index.write("bench", "wf", batches(vectors))
+        exact_ms, exact = measure(exact_index, probes, args.top_k)
+        print(f"{args.chunks} chunks x {args.dim} dims, top-{args.top_k}")
+        print(f"{'float32 exact':<22} {args.dim * 4:>6} B/vec scanned  p50 {exact_ms:7.2f} ms  recall 1.000")
+
+        for quantization in ("int8", "binary"):
+            index = LocalVectorIndex(f"{path}/{quantization}", quantization=quantization)
+            built = index.write("bench", "wf", batches(vectors))
+            code_bytes = index.get("bench", "wf").codes.nbytes // args.chunks
+            for factor in args.rescore_factors:
+                index.rescore_factor = factor
+                p50, found = measure(index, probes, args.top_k)
+                recall = statistics.mean(len(f & e) / args.top_k for f, e in zip(found, exact))
+                print(
+                    f"{quantization + ' x' + str(factor) + ' rescore':<22} {code_bytes:>6} B/vec scanned  "
+                    f"p50 {p50:7.2f} ms  recall {recall:.3f}  (build {built['seconds']:.1f}s)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Fan-out cost of the in-process status hub with many idle subscribers.
+
+    python -m benchmarks.status_fanout --subscribers 1000 5000 10000 --topics 1 100
+
+Each subscriber is a task parked on its queue, like an idle SSE connection.
+For every run we report memory per subscriber, how long one publish takes, and
+the time until every subscriber on the topic has the event in hand.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from app.utils.pubsub import StatusHub
+
+
+async def run(subscribers: int, topics: int, events: int) -> None:
+    hub = StatusHub(max_queue=16)
+    received = [0] * events
+    done = [asyncio.Event() for _ in range(events)]
+    per_topic = subscribers // topics
+
+    async def subscriber(topic: str) -> None:
+        with hub.subscribe(topic) as subscription:
+            while True:
+                event = await subscription.get()
+                index = event["index"]
+                received[index] += 1
+                if received[index] == per_topic:
+                    done[index].set()
+
+    tracemalloc.start()
+    before, _peak = tracemalloc.get_traced_memory()
+    tasks = [asyncio.create_task(subscriber(f"t{i % topics}")) for i in range(per_topic * topics)]
+    await asyncio.sleep(0)
+    after, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    publish_times, delivery_times = [], []
+    for index in range(events):
+        started = time.perf_counter()
+        hub.publish("t0", {"type": "workflow_status", "status": "in_progress", "index": index})
+        publish_times.append(time.perf_counter() - started)
+        await done[index].wait()
+        delivery_times.append(time.perf_counter() - started)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(
+        f"{subscribers:>6} subs / {topics:>4} topics  "
+        f"{(after - before) / len(tasks):7.0f} B/sub  "
+        f"publish {statistics.median(publish_times) * 1e3:7.3f} ms  "
+        f"all {per_topic} delivered {statistics.median(delivery_times) * 1e3:7.3f} ms (median of {events})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--topics", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+
+    for subscribers in args.subscribers:
+        for topics in args.topics:
+            asyncio.run(run(subscribers, topics, args.events))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Retrieval latency: one shared collection with a workflow_id filter versus one
+collection per workflow, at a growing number of workflows.
+
+Uses random vectors and query embeddings directly, so no embedding API calls:
+
+    python -m benchmarks.vector_partitioning --workflows 10 1000 10000
+"""
+import argparse
+import tempfile
+
+import chromadb
+import numpy as np
+
+from app.clients.vector_store import workflow_collection_name
+from benchmarks._timing import measure
+
+
+def populate(client, workflows: int, chunks: int, dim: int, rng):
+    shared = client.create_collection("workflow_collection")
+    batch_ids, batch_vectors, batch_metadata = [], [], []
+
+    for w in range(workflows):
+        workflow_id = f"wf-{w}"
+        vectors = rng.standard_normal((chunks, dim), dtype=np.float32)
+        ids = [f"{workflow_id}:{c}" for c in range(chunks)]
+        metadatas = [{"workflow_id": workflow_id}] * chunks
+
+        client.create_collection(workflow_collection_name(workflow_id)).add(
+            ids=ids, embeddings=vectors, metadatas=metadatas
+        )
+
+        batch_ids += ids
+        batch_vectors.append(vectors)
+        batch_metadata += metadatas
+        if len(batch_ids) >= 5000 or w == workflows - 1:
+            shared.add(ids=batch_ids, embeddings=np.vstack(batch_vectors), metadatas=batch_metadata)
+            batch_ids, batch_vectors, batch_metadata = [], [], []
+
+    return shared
+
+
+def run(workflows: int, chunks: int, dim: int, queries: int, top_k: int):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        shared = populate(client, workflows, chunks, dim, rng)
+        probes = rng.standard_normal((queries, dim), dtype=np.float32)
+        targets = [f"wf-{i % workflows}" for i in range(queries)]
+
+        shared_p50, shared_p99 = measure(
+            lambda q: shared.query(
+                query_embeddings=probes[q:q + 1], n_results=top_k, where={"workflow_id": targets[q]}
+            ),
+            queries,
+        )
+        partitioned_p50, partitioned_p99 = measure(
+            lambda q: client.get_collection(workflow_collection_name(targets[q])).query(
+                query_embeddings=probes[q:q + 1], n_results=top_k
+            ),
+            queries,
+        )
+
+    print(
+        f"{workflows:>6} workflows  shared p50 {shared_p50:7.2f} ms p99 {shared_p99:7.2f} ms  |  "
+        f"per-workflow p50 {partitioned_p50:7.2f} ms p99 {partitioned_p99:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workflows", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--chunks-per-workflow", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    for workflows in args.workflows:
+        run(workflows, args.chunks_per_workflow, args.dim, args.queries, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
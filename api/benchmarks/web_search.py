@@ -0,0 +1,86 @@
+"""
+Async SerpAPI client against the local stand-in: latency percentiles and how
+timeouts and server errors surface.
+
+    python -m benchmarks.web_search --requests 200 --concurrency 20 --latency 0.3 --error-rate 0.05 --hang-rate 0.05
+    python -m benchmarks.web_search --cached --distinct-queries 10
+
+--cached goes through the result cache (asearch_internet) with only
+--distinct-queries different queries, to show coalescing and hit rate.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from app.clients.http_client import close_http_clients
+from app.core.config import settings
+from app.utils.search_cache import search_cache
+from app.utils.web_search import fetch_search, asearch_internet
+from benchmarks.fake_serpapi import serve
+
+
+async def run(args) -> None:
+    search = asearch_internet if args.cached else fetch_search
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes: Counter = Counter()
+    latencies = []
+
+    async def one(i: int) -> None:
+        query = f"query {i % args.distinct_queries}" if args.cached else f"query {i}"
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await search(query)
+                assert result["articles"], "unexpected empty result"
+                outcomes["ok"] += 1
+            except httpx.TimeoutException:
+                outcomes["timeout"] += 1
+            except Exception as e:
+                outcomes[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    await close_http_clients()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{args.requests} searches in {elapsed:.2f}s  "
+        f"p50 {statistics.median(latencies) * 1e3:.0f} ms  p95 {p95 * 1e3:.0f} ms  max {latencies[-1] * 1e3:.0f} ms"
+    )
+    print("outcomes:", dict(outcomes))
+    if args.cached:
+        print("cache:", search_cache.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--read-timeout", type=float, default=settings.SERPAPI_READ_TIMEOUT)
+    parser.add_argument("--cached", action="store_true")
+    parser.add_argument("--distinct-queries", type=int, default=10)
+    args = parser.parse_args()
+
+    server = serve(0, args.latency, args.jitter, args.error_rate, args.hang_rate, hang_seconds=args.read_timeout * 2)
+    settings.SERPAPI_URL = f"http://127.0.0.1:{server.server_port}/search.json"
+    settings.SERPAPI_READ_TIMEOUT = args.read_timeout
+    try:
+        asyncio.run(run(args))
+    finally:
+        print(f"stand-in served {server.RequestHandlerClass.requests} requests")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Build the memory-mapped retrieval indexes (VECTOR_INDEX_BACKEND=local) from
+what Chroma already stores, e.g. for workflows ingested before the switch:
+
+    python -m scripts.build_local_indexes
+    python -m scripts.build_local_indexes --workflow <workflow id> --workflow <workflow id>
+    python -m scripts.build_local_indexes --dimension 768
+
+Without --workflow every workflow found in Chroma is indexed. Ingestion keeps
+the indexes current afterwards.
+"""
+import argparse
+
+import chromadb
+
+from app.clients.vector_store import is_partitioned, embedding_space, collection_for_workflow
+from app.core.config import settings
+from app.services.llm_service import rebuild_local_index
+
+
+def find_workflows(client: chromadb.ClientAPI, space: str, batch_size: int = 5000) -> list[str]:
+    if is_partitioned():
+        names = {getattr(collection, "name", collection) for collection in client.list_collections()}
+        # Workflow IDs are UUIDs, so the first "_" after the prefix starts the dimension suffix
+        candidates = {name.removeprefix("workflow_").split("_")[0] for name in names if name.startswith("workflow_")}
+        return sorted(
+            workflow_id for workflow_id in candidates
+            if collection_for_workflow(workflow_id, space) in names
+            and collection_for_workflow(workflow_id, space) != settings.CHROMA_COLLECTION
+        )
+
+    shared = client.get_collection(collection_for_workflow("", space))
+    workflows = set()
+    for offset in range(0, shared.count(), batch_size):
+        batch = shared.get(limit=batch_size, offset=offset, include=["metadatas"])
+        workflows.update((chunk_metadata or {}).get("workflow_id") for chunk_metadata in batch["metadatas"])
+    workflows.discard(None)
+    return sorted(workflows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workflow", action="append", help="Workflow to index; repeatable. Default: all.")
+    parser.add_argument("--embedding-model", default=settings.DEFAUTL_EMBEDDINGS_MODEL)
+    parser.add_argument("--dimension", type=int, help="Reduced embedding size the workflows use, if any.")
+    args = parser.parse_args()
+
+    space = embedding_space(args.embedding_model, args.dimension)
+    workflows = args.workflow or find_workflows(chromadb.PersistentClient(path=settings.CHROMA_PATH), space)
+    for workflow_id in workflows:
+        index = rebuild_local_index(workflow_id, space)
+        print(f"{workflow_id}: {index['count']} chunks, {index['dimension']} dims in {index['seconds']}s")
+
+    print(f"✨ Indexed {len(workflows)} workflows under {settings.LOCAL_INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+One-shot migration from the shared Chroma collection to one collection per workflow.
+
+Stored embeddings are copied as-is, nothing is re-embedded:
+
+    python -m scripts.split_workflow_collections --dry-run
+    python -m scripts.split_workflow_collections --delete-source
+    python -m scripts.split_workflow_collections --dimension 768
+
+Workflows that use a reduced embedding dimension keep their vectors in a
+separate, size-suffixed collection; run once per dimension in use, with
+--dimension, to split those too.
+
+Set VECTOR_PARTITIONING=per_workflow once the copy has finished.
+"""
+import argparse
+from collections import defaultdict
+
+import chromadb
+
+from app.clients.vector_store import workflow_collection_name, sized_collection_name, embedding_space
+from app.core.config import settings
+
+
+def split_collection(
+        client: chromadb.ClientAPI,
+        source_name: str,
+        space: str,
+        batch_size: int = 1000,
+        dry_run: bool = False,
+) -> dict:
+    """Copy `source_name`'s chunks into per-workflow collections for the embedding space `space`."""
+    source = client.get_collection(source_name)
+    total = source.count()
+    copied = defaultdict(int)
+    skipped = 0
+
+    for offset in range(0, total, batch_size):
+        batch = source.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+
+        grouped = defaultdict(lambda: {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+        for i, chunk_id in enumerate(batch["ids"]):
+            chunk_metadata = batch["metadatas"][i] or {}
+            workflow_id = chunk_metadata.get("workflow_id")
+            if not workflow_id:
+                skipped += 1
+                continue
+            group = grouped[workflow_id]
+            group["ids"].append(chunk_id)
+            group["embeddings"].append(batch["embeddings"][i])
+            group["documents"].append(batch["documents"][i])
+            group["metadatas"].append(chunk_metadata)
+
+        for workflow_id, group in grouped.items():
+            copied[workflow_id] += len(group["ids"])
+            if dry_run:
+                continue
+            target = client.get_or_create_collection(
+                sized_collection_name(workflow_collection_name(workflow_id), space),
+                metadata=source.metadata,
+            )
+            # upsert keeps the migration re-runnable after a partial failure
+            target.upsert(**group)
+
+        print(f"Processed {min(offset + batch_size, total)}/{total} chunks")
+
+    return {"total": total, "workflows": len(copied), "skipped": skipped, "per_workflow": dict(copied)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", help="Shared collection to split. Default: the one for --dimension.")
+    parser.add_argument("--embedding-model", default=settings.DEFAUTL_EMBEDDINGS_MODEL)
+    parser.add_argument("--dimension", type=int, help="Reduced embedding size whose vectors to split, if any.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Count chunks per workflow without writing.")
+    parser.add_argument("--delete-source", action="store_true", help="Drop the shared collection afterwards.")
+    args = parser.parse_args()
+
+    space = embedding_space(args.embedding_model, args.dimension)
+    source = args.source or sized_collection_name(settings.CHROMA_COLLECTION, space)
+    client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
+    report = split_collection(client, source, space, args.batch_size, args.dry_run)
+
+    print(
+        f"✨ {report['total']} chunks across {report['workflows']} workflows "
+        f"({report['skipped']} without workflow_id skipped)"
+    )
+
+    if args.delete_source and not args.dry_run:
+        if report["skipped"]:
+            print("⚠️ Keeping the source collection: some chunks had no workflow_id")
+        else:
+            client.delete_collection(source)
+            print(f"🗑️ Deleted collection {source}")
+
+
+if __name__ == "__main__":
+    main()
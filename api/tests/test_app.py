@@ -0,0 +1,21 @@
+import asyncio
+from unittest import mock
+
+from app import app as app_module
+from app.core.config import metadata
+
+
+def test_lifespan_warms_vector_store_for_configured_models():
+    registry = mock.MagicMock()
+    workers = mock.MagicMock(start=mock.AsyncMock(), stop=mock.AsyncMock())
+
+    async def run():
+        async with app_module.lifespan(app_module.app):
+            registry.warmup.assert_called_once_with(metadata.embedding_models)
+
+    with mock.patch.object(app_module, "vector_store_registry", registry), \
+            mock.patch.object(app_module, "job_workers", workers):
+        asyncio.run(run())
+
+    workers.start.assert_awaited_once()
+    registry.close.assert_called_once()
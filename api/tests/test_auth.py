@@ -0,0 +1,49 @@
+from unittest import mock
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app import app as app_module
+from app.clients import supabase_client
+
+GOOD_TOKEN = "good-token"
+
+
+def auth_stub(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/auth/v1/user":
+            if request.headers["authorization"] == f"Bearer {GOOD_TOKEN}":
+                return httpx.Response(200, json={"id": "user-1"})
+            return httpx.Response(401, json={"msg": "invalid JWT"})
+        return httpx.Response(200, json=[])
+
+    return httpx.MockTransport(handler)
+
+
+def client_with_stub(calls):
+    return mock.patch.multiple(
+        supabase_client,
+        supabase_async_transport=lambda: auth_stub(calls),
+        _verified_tokens=supabase_client.OrderedDict(),
+    )
+
+
+def test_rejected_token_gets_401_before_any_query():
+    calls = []
+    with client_with_stub(calls), mock.patch.object(supabase_client.settings, "SUPABASE_URL", "http://supabase.test"):
+        response = TestClient(app_module.app).get("/api/workflows/", headers={"Authorization": "Bearer forged"})
+
+    assert response.status_code == 401
+    assert calls == ["/auth/v1/user"]
+
+
+def test_verified_token_is_cached():
+    calls = []
+    with client_with_stub(calls), mock.patch.object(supabase_client.settings, "SUPABASE_URL", "http://supabase.test"):
+        client = TestClient(app_module.app)
+        for _ in range(2):
+            response = client.get("/api/workflows/", headers={"Authorization": f"Bearer {GOOD_TOKEN}"})
+            assert response.status_code == 200
+
+    assert calls.count("/auth/v1/user") == 1
@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import Client
 from typing import List
 from uuid import UUID
 
 from app.api.deps import get_supabase_user
+from app.core.config import settings
+from app.services.job_worker import job_workers, EXECUTE_WORKFLOW
+from app.utils.job_queue import job_queue
 from app.services.workflows_service import WorkflowsService
 from app.schemas.workflow import WorkflowCreate, WorkflowOut, WorkflowUpdate
 
 from app.services.documents_service import DocumentsService
 from app.schemas.document import DocumentOut
+from app.schemas.job import JobOut
 
 
 import asyncio
@@ -82,10 +87,52 @@ async def list_documents_by_workflow(
     service = DocumentsService(client)
     return service.list_documents_by_workflow(workflow_id)
 
-@router.post("/workflows/{workflow_id}/execute", response_model=dict)
-async def execute_workflow(workflow_id: UUID, client: Client = Depends(get_supabase_user)):
-    service = WorkflowsService(client)
+def _workflow_job_key(workflow_id: UUID) -> str:
+    return f"workflow:{workflow_id}"
 
-    asyncio.create_task(service.execute_workflow(workflow_id))
 
-    return {"message": "Executing Workflow it may take a while...", "status": "pending"}
+@router.post("/workflows/{workflow_id}/execute", response_model=dict)
+async def execute_workflow(
+    workflow_id: UUID,
+    client: Client = Depends(get_supabase_user),
+    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+):
+    service = WorkflowsService(client)
+    if not service.get_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    # The worker acts as the caller, so their token travels with the job
+    job = await asyncio.to_thread(
+        job_queue.enqueue,
+        EXECUTE_WORKFLOW,
+        {"workflow_id": str(workflow_id)},
+        access_token=credentials.credentials,
+        dedupe_key=_workflow_job_key(workflow_id),
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+    job_workers.notify()
+
+    return {
+        "message": "Executing Workflow it may take a while...",
+        "status": "pending",
+        "job_id": job["id"],
+        "job_status": job["status"],
+    }
+
+
+@router.get("/workflows/{workflow_id}/jobs", response_model=List[JobOut])
+async def list_workflow_jobs(workflow_id: UUID, client: Client = Depends(get_supabase_user)):
+    # RLS decides whether the caller may see this workflow, and so its jobs
+    if not WorkflowsService(client).get_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return await asyncio.to_thread(job_queue.list_by_dedupe_key, _workflow_job_key(workflow_id))
+
+
+@router.get("/workflows/{workflow_id}/jobs/{job_id}", response_model=JobOut)
+async def get_workflow_job(workflow_id: UUID, job_id: str, client: Client = Depends(get_supabase_user)):
+    if not WorkflowsService(client).get_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job or job["dedupe_key"] != _workflow_job_key(workflow_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
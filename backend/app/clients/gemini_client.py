@@ -1,10 +1,14 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 import os
+import threading
 from pydantic import SecretStr
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_chat_models = {}
+_chat_models_lock = threading.Lock()
+
 
 def get_gemini_embedding_function(embedding_model: str = "models/gemini-embedding-001"):
     api_key = os.getenv("GOOGLE_API_KEY")
@@ -18,3 +22,20 @@ def get_gemini_embedding_function(embedding_model: str = "models/gemini-embeddin
     )
 
     return embeddings
+
+
+def get_chat_model(model: str, temperature: float, max_retries: int = 2) -> ChatGoogleGenerativeAI:
+    """Chat client for (model, temperature, max_retries), created once and reused across requests."""
+    key = (model, float(temperature), max_retries)
+    with _chat_models_lock:
+        llm = _chat_models.get(key)
+        if llm is None:
+            llm = ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                max_tokens=None,
+                timeout=None,
+                max_retries=max_retries,
+            )
+            _chat_models[key] = llm
+        return llm
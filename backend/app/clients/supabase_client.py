@@ -1,23 +1,157 @@
-from supabase import create_client, Client
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import httpx
+from supabase import create_client, Client, ClientOptions
 from app.core.config import settings
 
+_transport: Optional[httpx.HTTPTransport] = None
+_service_client: Optional[Client] = None
+_lock = threading.Lock()
+# sha256(token) -> time until which the token counts as verified
+_verified_tokens: "OrderedDict[str, float]" = OrderedDict()
+_verified_lock = threading.Lock()
 
-def supabase_service_client() -> Client:
-    client = create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_ANON_KEY,
+
+class InvalidAccessToken(Exception):
+    """Supabase Auth rejected the bearer token (forged, revoked or expired)."""
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
     )
-    return client
 
 
-def supabase_user_client(access_token: str) -> Client:
+def supabase_transport() -> httpx.HTTPTransport:
+    """
+    Process-wide connection pool shared by every Supabase client.
+    TLS sessions and keep-alive connections live here, not in the clients.
+    """
+    global _transport
+    if _transport is None:
+        with _lock:
+            if _transport is None:
+                _transport = httpx.HTTPTransport(
+                    limits=_pool_limits(),
+                    http2=settings.SUPABASE_HTTP2,
+                    retries=settings.SUPABASE_CONNECT_RETRIES,
+                )
+    return _transport
+
+
+def _http_client(access_token: Optional[str] = None) -> httpx.Client:
+    # Cheap per-request wrapper: headers are per user, the pool is shared.
+    headers = {"Authorization": f"Bearer {access_token}"} if access_token else None
+    return httpx.Client(
+        transport=supabase_transport(),
+        headers=headers,
+        timeout=settings.SUPABASE_HTTP_TIMEOUT,
+    )
+
+
+def _token_expiry(access_token: str) -> Optional[float]:
+    """The JWT's `exp` claim, read without checking the signature (Supabase Auth does that)."""
+    try:
+        payload = access_token.split(".")[1]
+        return float(json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
 
+def _check_cached(access_token: str) -> Tuple[str, bool]:
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    now = time.time()
+    expires_at = _token_expiry(access_token)
+    if expires_at is not None and expires_at <= now:
+        raise InvalidAccessToken("Token expired")
+    with _verified_lock:
+        valid_until = _verified_tokens.get(key)
+        if valid_until is not None and valid_until > now:
+            _verified_tokens.move_to_end(key)
+            return key, True
+    return key, False
+
+
+def _remember_verified(key: str, access_token: str) -> None:
+    valid_until = time.time() + settings.SUPABASE_TOKEN_CACHE_TTL
+    expires_at = _token_expiry(access_token)
+    with _verified_lock:
+        _verified_tokens[key] = min(valid_until, expires_at) if expires_at is not None else valid_until
+        _verified_tokens.move_to_end(key)
+        while len(_verified_tokens) > settings.SUPABASE_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+
+
+def _check_auth_response(response: httpx.Response) -> None:
+    if response.status_code in (401, 403):
+        raise InvalidAccessToken(f"Supabase Auth rejected the token (HTTP {response.status_code})")
+    response.raise_for_status()
+
+
+def _auth_user_request(access_token: str) -> Tuple[str, dict]:
+    return f"{settings.SUPABASE_URL}/auth/v1/user", {
+        "apikey": settings.SUPABASE_ANON_KEY,
+        "Authorization": f"Bearer {access_token}",
+    }
+
+
+def verify_access_token(access_token: str) -> None:
+    """
+    Check a bearer token with Supabase Auth (GET /auth/v1/user), as
+    `auth.set_session` used to on every client build. A token that passes is
+    trusted for SUPABASE_TOKEN_CACHE_TTL seconds, and never past its `exp`.
+    Raises InvalidAccessToken if it is rejected.
+    """
+    key, cached = _check_cached(access_token)
+    if cached:
+        return
+    url, headers = _auth_user_request(access_token)
+    # Not `with`: closing the wrapper would close the shared transport
+    client = httpx.Client(transport=supabase_transport(), timeout=settings.SUPABASE_HTTP_TIMEOUT)
+    _check_auth_response(client.get(url, headers=headers))
+    _remember_verified(key, access_token)
+
+
+def supabase_service_client() -> Client:
+    global _service_client
+    if _service_client is None:
+        with _lock:
+            if _service_client is None:
+                _service_client = create_client(
+                    settings.SUPABASE_URL,
+                    settings.SUPABASE_ANON_KEY,
+                    options=ClientOptions(httpx_client=_http_client()),
+                )
+    return _service_client
+
+
+def supabase_user_client(access_token: str) -> Client:
+    # The pooled client only forwards the JWT, so check it up front like auth.set_session did
+    verify_access_token(access_token)
     client = create_client(
         settings.SUPABASE_URL,
         settings.SUPABASE_ANON_KEY,
+        options=ClientOptions(httpx_client=_http_client(access_token)),
     )
 
-    client.auth.set_session(access_token, "")
+    # The JWT travels as a per-request header; PostgREST verifies it on every call.
     client.postgrest.auth(access_token)
 
     return client
+
+
+def close_supabase_pool() -> None:
+    global _transport, _service_client
+    with _lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = None
+        _service_client = None
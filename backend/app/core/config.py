@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
@@ -17,9 +19,37 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = Field(default=os.getenv("SUPABASE_ANON_KEY", ""))
     # SUPABASE_SERVICE_KEY: str = None
 
+    # Shared HTTP connection pool used by every Supabase client in the process
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_HTTP_TIMEOUT: float = 10.0
+    SUPABASE_HTTP2: bool = False
+    SUPABASE_CONNECT_RETRIES: int = 1
+    # Bearer tokens checked with Supabase Auth are trusted for this many seconds (never past their exp)
+    SUPABASE_TOKEN_CACHE_TTL: float = 60.0
+    SUPABASE_TOKEN_CACHE_SIZE: int = 10000
+
     CHROMA_PATH: str = Field(default="chroma")
+    # Documents of one workflow ingested at the same time
+    INGEST_MAX_CONCURRENT_DOCUMENTS: int = 3
     TEMP_DIR: str = Field(default="temp")
 
+    # Query embeddings: in-memory LRU plus an optional SQLite tier (disabled when path is unset)
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    QUERY_EMBEDDING_CACHE_PATH: Optional[str] = None
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Content-addressed document chunk vectors, reused across uploads and workflows
+    CHUNK_EMBEDDING_STORE_PATH: str = os.path.join("chroma", "chunk_embeddings.db")
+    # Durable workflow execution queue: worker count, attempts, lease length and retry backoff (seconds)
+    JOB_QUEUE_PATH: str = os.path.join("chroma", "jobs.db")
+    JOB_WORKERS: int = 2
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_VISIBILITY_TIMEOUT: float = 300.0
+    JOB_HEARTBEAT_INTERVAL: float = 60.0
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_RETRY_BACKOFF: float = 10.0
+
 
 settings = Settings()
 
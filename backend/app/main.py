@@ -1,10 +1,14 @@
 import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import HTTPException
 
 from app.core.config import settings
+from app.clients.supabase_client import close_supabase_pool
+from app.services.job_worker import job_workers
+from app.utils.job_queue import job_queue
 from app.core.logging import setup_logging
 from app.api.routes import health, workflows, documents, sessions, messages, metadata
 import os
@@ -15,7 +19,17 @@ load_dotenv()
 
 setup_logging()
 
-app = FastAPI(title=settings.APP_NAME)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_workers.start()
+    yield
+    await job_workers.stop()
+    job_queue.close()
+    close_supabase_pool()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
 from datetime import datetime
 
@@ -11,6 +11,8 @@ class ChatSessionCreate(BaseModel):
 class chatMessageCreateMetadata(BaseModel):
     workflow_id: UUID
     is_first: Optional[bool] = None
+    # Restrict retrieval to these documents of the workflow
+    document_ids: Optional[List[UUID]] = None
 class ChatMessageCreate(BaseModel):
     message: str
     metadata: Optional[chatMessageCreateMetadata] = None
@@ -1,5 +1,5 @@
 from supabase import Client
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from uuid import UUID
 from app.dao.sessions_dao import SessionsDAO
 from app.dao.messages_dao import MessagesDAO
@@ -38,6 +38,7 @@ class ChatService:
         workflow_id: UUID,
         temperature: float = 0.7,
         model: str = "gemini-2.5-pro",
+        document_ids: Optional[List[UUID]] = None,
     ) -> str:
         response = query_rag(
             query_text=user_message,
@@ -45,6 +46,7 @@ class ChatService:
             system_prompt=system_prompt,
             temperature=temperature,
             workflow_id=str(workflow_id),
+            document_ids=document_ids,
         )
 
         return response
@@ -104,6 +106,7 @@ class ChatService:
                 else "gemini-2.5-flash"
             ),
             workflow_id=session["workflow_id"],
+            document_ids=payload.metadata.document_ids if payload.metadata else None,
         )
 
         # 3. Store and return assistant message
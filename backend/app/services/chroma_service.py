@@ -2,13 +2,15 @@ import os
 import shutil
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
-from app.clients.gemini_client import get_gemini_embedding_function
+from app.clients.gemini_client import get_gemini_embedding_function, get_chat_model
 from langchain.vectorstores.chroma import Chroma
 from app.core.config import settings, metadata
 from langchain.vectorstores.chroma import Chroma
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, List
+from uuid import UUID
+from app.utils.embedding_cache import query_embedding_cache, chunk_embedding_store, chunk_content_hash
 
 PROMPT_TEMPLATE = """
 Answer the question based only on the following context:
@@ -31,61 +33,113 @@ def split_documents(documents: list[Document]):
     return text_splitter.split_documents(documents)
 
 
-def add_to_chroma(chunks: list[Document], workflow_id: str):
+def add_to_chroma(
+    chunks: list[Document],
+    workflow_id: str,
+    embedding_model: str = metadata.embedding_models[0],
+    document_id: Optional[str] = None,
+    legacy_source: Optional[str] = None,
+) -> dict:
+    embedding_function = get_gemini_embedding_function(embedding_model)
     db = Chroma(
         persist_directory=settings.CHROMA_PATH,
-        embedding_function=get_gemini_embedding_function(),
+        embedding_function=embedding_function,
     )
 
-    chunks_with_ids = calculate_chunk_ids(chunks)
+    chunks_with_ids = calculate_chunk_ids(chunks, workflow_id, embedding_model, document_id)
+    unique_chunks = {}
     for chunk in chunks_with_ids:
         chunk.metadata["workflow_id"] = workflow_id
-
-    # Add or Update the documents.
-    existing_items = db.get(include=[])  # IDs are always included by default
-    existing_ids = set(existing_items["ids"])
-    print(f"Number of existing documents in DB: {len(existing_ids)}")
-
-    # Only add documents that don't exist in the DB.
-    new_chunks = []
-    for chunk in chunks_with_ids:
-        if chunk.metadata["id"] not in existing_ids:
-            new_chunks.append(chunk)
-
-    if len(new_chunks):
-        print(f"👉 Adding new documents: {len(new_chunks)}")
-        new_chunk_ids = [chunk.metadata["id"] for chunk in new_chunks]
-        db.add_documents(new_chunks, ids=new_chunk_ids)
-        db.persist()
+        unique_chunks.setdefault(chunk.metadata["id"], chunk)
+    ids = list(unique_chunks.keys())
+
+    # Look up only the IDs we are about to write, not every ID in the store
+    existing = db._collection.get(ids=ids, include=["metadatas"]) if ids else {"ids": [], "metadatas": []}
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+
+    new_ids = [id_ for id_ in ids if id_ not in existing_metadata]
+    changed_ids = [
+        id_ for id_ in ids
+        if id_ in existing_metadata and existing_metadata[id_] != unique_chunks[id_].metadata
+    ]
+
+    if new_ids:
+        print(f"👉 Adding new documents: {len(new_ids)}")
+        texts = [unique_chunks[id_].page_content for id_ in new_ids]
+        _hashes, vectors, embedded = chunk_embedding_store.embed(
+            embedding_model, texts, embedding_function.embed_documents
+        )
+        print(f"♻️ Reused {len(texts) - embedded} stored chunk embeddings")
+        db._collection.add(
+            ids=new_ids,
+            embeddings=vectors,
+            documents=texts,
+            metadatas=[unique_chunks[id_].metadata for id_ in new_ids],
+        )
     else:
         print("✅ No new documents to add")
 
+    if changed_ids:
+        # Same text means same vector; only the metadata needs rewriting
+        db._collection.update(
+            ids=changed_ids, metadatas=[unique_chunks[id_].metadata for id_ in changed_ids]
+        )
+
+    removed = 0
+    if document_id is not None:
+        # Chunks of the previous version of this document that are gone now
+        current = db._collection.get(
+            where=retrieval_filter(workflow_id, [document_id]), include=[]
+        )["ids"]
+        keep = set(ids)
+        stale = [id_ for id_ in current if id_ not in keep]
+        if legacy_source:
+            stale.extend(legacy_chunk_ids(db, workflow_id, legacy_source))
+        for start in range(0, len(stale), 500):
+            db._collection.delete(ids=stale[start:start + 500])
+        removed = len(stale)
+
+    return {
+        "added": len(new_ids),
+        "updated": len(changed_ids),
+        "unchanged": len(ids) - len(new_ids) - len(changed_ids),
+        "removed": removed,
+    }
+
+
+def legacy_chunk_ids(db: Chroma, workflow_id: str, source: str) -> List[str]:
+    """
+    IDs of a document's chunks stored before chunks carried a document_id.
+    Those were tagged only with PyPDFLoader's source, the download path.
+    """
+    found = db._collection.get(
+        where={"$and": [{"workflow_id": workflow_id}, {"source": source}]}, include=["metadatas"]
+    )
+    return [
+        id_ for id_, chunk_metadata in zip(found["ids"], found["metadatas"])
+        if not (chunk_metadata or {}).get("document_id")
+    ]
 
-def calculate_chunk_ids(chunks):
 
-    # This will create IDs like "data/monopoly.pdf:6:2"
-    # Page Source : Page Number : Chunk Index
+def calculate_chunk_ids(
+    chunks,
+    workflow_id: str,
+    embedding_model: str = metadata.embedding_models[0],
+    document_id: Optional[str] = None,
+):
 
-    last_page_id = None
-    current_chunk_index = 0
+    # This will create IDs like "<workflow_id>:<document_id>:<sha256 of model + chunk text>"
+    # so the same file name in two workflows never collides, unchanged chunks
+    # keep their ID across re-uploads, and re-indexing one document never
+    # touches another's chunks.
 
     for chunk in chunks:
-        source = chunk.metadata.get("source")
-        page = chunk.metadata.get("page")
-        current_page_id = f"{source}:{page}"
-
-        # If the page ID is the same as the last one, increment the index.
-        if current_page_id == last_page_id:
-            current_chunk_index += 1
+        content_hash = chunk_content_hash(embedding_model, chunk.page_content)
+        chunk.metadata["content_hash"] = content_hash
+        if document_id is None:
+            chunk.metadata["id"] = f"{workflow_id}:{content_hash}"
         else:
-            current_chunk_index = 0
-
-        # Calculate the chunk ID.
-        chunk_id = f"{current_page_id}:{current_chunk_index}"
-        last_page_id = current_page_id
-
-        # Add it to the page meta-data.
-        chunk.metadata["id"] = chunk_id
+            chunk.metadata["id"] = f"{workflow_id}:{document_id}:{content_hash}"
 
     return chunks
 
@@ -95,6 +149,28 @@ def clear_database():
         shutil.rmtree(settings.CHROMA_PATH)
 
 
+def retrieval_filter(workflow_id: str, document_ids: Optional[List[UUID]] = None) -> dict:
+    """Chroma `where` clause for a workflow, optionally narrowed to some of its documents."""
+    if not document_ids:
+        return {"workflow_id": workflow_id}
+    return {
+        "$and": [
+            {"workflow_id": workflow_id},
+            {"document_id": {"$in": [str(document_id) for document_id in document_ids]}},
+        ]
+    }
+
+
+@lru_cache(maxsize=256)
+def compiled_prompt(system_prompt: str) -> ChatPromptTemplate:
+    """
+    Prompt template for a workflow's system prompt, parsed once. Keyed by the
+    prompt text itself, so an edited definition simply compiles a new one.
+    The per-turn context and question come last, keeping a stable prefix.
+    """
+    return ChatPromptTemplate.from_template(system_prompt + PROMPT_TEMPLATE)
+
+
 def query_rag(
     query_text: str,
     system_prompt: str,
@@ -102,6 +178,7 @@ def query_rag(
     workflow_id: str,
     temperature: float,
     top_k: int = 5,
+    document_ids: Optional[List[UUID]] = None,
 ):
     # Prepare the DB.
     embedding_function = get_gemini_embedding_function()
@@ -110,23 +187,19 @@ def query_rag(
     )
 
     # Search the DB.
-    results = db.similarity_search_with_score(
-        query_text, k=top_k, filter={"workflow_id": workflow_id}
+    query_embedding = query_embedding_cache.get_or_compute(
+        embedding_function.model, query_text, embedding_function.embed_query
+    )
+    results = db.similarity_search_by_vector_with_relevance_scores(
+        query_embedding, k=top_k, filter=retrieval_filter(workflow_id, document_ids)
     )
     print(f"Found {len(results)} {results} relevant chunks.")
 
     context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in results])
-    prompt_template = ChatPromptTemplate.from_template(system_prompt + PROMPT_TEMPLATE)
-    prompt = prompt_template.format(context=context_text, question=query_text)
+    prompt = compiled_prompt(system_prompt).format(context=context_text, question=query_text)
     print("\n\n\n\nPROMPTTTTTTTTTTTTTTTTTTT: ", prompt)
 
-    llm = ChatGoogleGenerativeAI(
-        model=model,
-        temperature=temperature,
-        max_tokens=None,
-        timeout=None,
-        max_retries=2,
-    )
+    llm = get_chat_model(model, temperature)
     response_text = llm.invoke(prompt)
 
     sources = [doc.metadata.get("id", None) for doc, _score in results]
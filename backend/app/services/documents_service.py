@@ -1,16 +1,22 @@
+import asyncio
 from supabase import Client
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from app.dao.documents_dao import DocumentsDAO
 from app.schemas.document import DocumentCreate, DocumentOut
 import os
+import tempfile
 import requests
 from langchain.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from app.core.config import metadata
+from app.core.config import metadata, settings
 from .chroma_service import split_documents, add_to_chroma
 
 TEMP_DIR = "tmp_docs"
+DOWNLOAD_TIMEOUT = (10, 60)
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+_http = requests.Session()
 
 
 class DocumentsService:
@@ -37,28 +43,36 @@ class DocumentsService:
         document = self.dao.update_document_status(document_id, status)
         return DocumentOut(**document)
 
-    def get_documents_by_workflow(self, workflow_id: UUID) -> DocumentOut:
-        documents = self.dao.list_documents_by_workflow(workflow_id)
-        return DocumentOut(**documents[0])
-
-    def download_document(self, document_id: UUID) -> str:
+    def download_document(self, document_id: UUID) -> Tuple[str, str]:
+        """Download to a unique temp file; returns (local path, original file name)."""
         document = self.get_document(document_id)
         if not document:
             raise ValueError("Document not found")
 
-        if not os.path.exists(TEMP_DIR):
-            os.makedirs(TEMP_DIR)
+        os.makedirs(TEMP_DIR, exist_ok=True)
 
-        local_path = os.path.join(TEMP_DIR, f"{document.file_name}")
+        # Unique name per download so concurrent ingestions of the same file can't collide
+        fd, local_path = tempfile.mkstemp(
+            prefix="download-", suffix=os.path.splitext(document.file_name)[1], dir=TEMP_DIR
+        )
+        try:
+            with os.fdopen(fd, "wb") as f, _http.get(document.file_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code != 200:
+                    raise ValueError("Failed to download document")
 
-        response = requests.get(document.file_url)
-        if response.status_code != 200:
-            raise ValueError("Failed to download document")
+                size = 0
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+                    size += len(chunk)
 
-        with open(local_path, "wb") as f:
-            f.write(response.content)
+                expected = response.headers.get("content-length")
+                if expected and "content-encoding" not in response.headers and int(expected) != size:
+                    raise ValueError(f"Download truncated: expected {expected} bytes, got {size}")
+        except BaseException:
+            os.remove(local_path)
+            raise
 
-        return local_path
+        return local_path, document.file_name
 
     def process_and_store_document(
         self,
@@ -66,22 +80,66 @@ class DocumentsService:
         workflow_id: UUID,
         embedding_model: Optional[str],
     ) -> dict:
-        file_path = self.download_document(document_id)
+        file_path, file_name = self.download_document(document_id)
 
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
+        try:
+            loader = PyPDFLoader(file_path)
+            documents = loader.load()
+        finally:
+            os.remove(file_path)
 
         chunks = split_documents(documents)
-        add_to_chroma(chunks,str(workflow_id))
+        # Tag chunks before they are stored so retrieval can filter by document
         for i, chunk in enumerate(chunks):
+            # PyPDFLoader records the random temp path; keep metadata stable across re-ingests
+            chunk.metadata["source"] = file_name
             chunk.metadata["document_id"] = str(document_id)
             chunk.metadata["chunk_index"] = i
+        index_report = add_to_chroma(
+            chunks, str(workflow_id), embedding_model or metadata.embedding_models[0], str(document_id),
+            # Where chunks indexed before they carried a document_id point to
+            legacy_source=os.path.join(TEMP_DIR, file_name),
+        )
 
         # if not embedding_model:
         #     embedding_model = metadata.embedding_models[0]
 
         self.update_document_status(document_id, "processed")
         print(f"Document {document_id} processed with {len(chunks)} chunks.")
-        os.remove(file_path)
 
-        return {"document_id": document_id, "chunks_added": len(chunks)}
+        return {"document_id": document_id, "chunks_added": len(chunks), **index_report}
+
+    async def process_workflow_documents(
+        self, workflow_id: UUID, embedding_model: Optional[str]
+    ) -> dict:
+        """
+        Ingest every pending document of the workflow, at most
+        INGEST_MAX_CONCURRENT_DOCUMENTS at a time, each with its own status.
+        """
+        documents = self.list_documents_by_workflow(workflow_id)
+        pending = [document for document in documents if document.status != "processed"]
+        semaphore = asyncio.Semaphore(max(1, settings.INGEST_MAX_CONCURRENT_DOCUMENTS))
+
+        async def ingest(document: DocumentOut) -> dict:
+            async with semaphore:
+                self.update_document_status(document.id, "in_progress")
+                try:
+                    return await asyncio.to_thread(
+                        self.process_and_store_document,
+                        document_id=document.id,
+                        workflow_id=workflow_id,
+                        embedding_model=embedding_model,
+                    )
+                except Exception as e:
+                    print(f"Document {document.id} failed to process: {e}")
+                    self.update_document_status(document.id, "failed")
+                    return {"document_id": document.id, "error": str(e)}
+
+        results = await asyncio.gather(*(ingest(document) for document in pending))
+
+        return {
+            "documents": len(documents),
+            "already_processed": len(documents) - len(pending),
+            "processed": [result for result in results if "error" not in result],
+            "failed": [result for result in results if "error" in result],
+        }
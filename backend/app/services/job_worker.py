@@ -0,0 +1,138 @@
+import asyncio
+import os
+import traceback
+import uuid
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+from app.clients.supabase_client import supabase_user_client
+from app.core.config import settings
+from app.services.workflows_service import WorkflowsService
+from app.utils.job_queue import JobQueue, job_queue
+
+# (payload, access_token) -> JSON-serialisable result
+JobHandler = Callable[[Dict[str, Any], Optional[str]], Awaitable[Any]]
+
+EXECUTE_WORKFLOW = "execute_workflow"
+
+
+class JobWorkerPool:
+    """
+    A fixed number of asyncio workers pulling jobs from a JobQueue. Each running
+    job has its lease extended in the background until the handler returns; if
+    the lease is lost the handler is cancelled and its outcome is not recorded,
+    since the job now belongs to another worker.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int, poll_interval: float, heartbeat_interval: float):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._prefix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def notify(self) -> None:
+        """Wake idle workers after an enqueue instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        recovered = await asyncio.to_thread(self.queue.recover)
+        if recovered:
+            print(f"[JobWorkerPool] Recovered {recovered} job(s) left running by a previous process")
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(f"{self._prefix}-{i}"), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _heartbeat(
+            self, job_id: str, worker_id: str, work: asyncio.Task, lease_lost: asyncio.Event
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, job_id, worker_id):
+                print(f"[JobWorkerPool] Lost lease on job {job_id}, cancelling it")
+                lease_lost.set()
+                work.cancel()
+                return
+
+    async def _run(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim, worker_id)
+            except Exception as e:
+                print(f"[JobWorkerPool] Failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._execute(job, worker_id)
+
+    async def _execute(self, job: Dict[str, Any], worker_id: str) -> None:
+        job_id = job["id"]
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(
+                self.queue.fail, job_id, worker_id, f"No handler for job kind {job['kind']!r}", False
+            )
+            return
+
+        print(f"[JobWorkerPool] {worker_id} running {job['kind']} job {job_id} (attempt {job['attempts']})")
+        lease_lost = asyncio.Event()
+        work = asyncio.create_task(handler(job["payload"], job.get("access_token")))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id, work, lease_lost))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if lease_lost.is_set() and not asyncio.current_task().cancelling():
+                # Another worker owns the job now; leave its record alone
+                return
+            # Shutting down: hand the job back so the next process picks it up straight away
+            await asyncio.to_thread(self.queue.release, job_id, worker_id)
+            raise
+        except Exception as e:
+            if lease_lost.is_set():
+                return
+            print(f"[JobWorkerPool] Job {job_id} failed:\n{traceback.format_exc()}")
+            failed = await asyncio.to_thread(self.queue.fail, job_id, worker_id, str(e))
+            if failed and failed["status"] == "queued":
+                print(f"[JobWorkerPool] Job {job_id} will be retried")
+        else:
+            if not lease_lost.is_set():
+                await asyncio.to_thread(self.queue.complete, job_id, worker_id, result)
+        finally:
+            heartbeat.cancel()
+            work.cancel()
+
+
+async def execute_workflow_job(payload: Dict[str, Any], access_token: Optional[str]) -> Any:
+    client = supabase_user_client(access_token)
+    return await WorkflowsService(client).execute_workflow(uuid.UUID(payload["workflow_id"]))
+
+
+job_workers = JobWorkerPool(
+    job_queue,
+    workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    heartbeat_interval=settings.JOB_HEARTBEAT_INTERVAL,
+)
+job_workers.register(EXECUTE_WORKFLOW, execute_workflow_job)
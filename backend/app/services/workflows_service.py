@@ -53,7 +53,9 @@ class WorkflowsService:
             )
             return None
 
-        if workflow.status in ("in_progress", "completed"):
+        # The job queue runs at most one execution per workflow, so an "in_progress"
+        # status here is a previous attempt that died and is safe to resume.
+        if workflow.status == "completed":
             print(
                 f"[WorkflowService] Workflow {workflow_id} is already {workflow.status}"
             )
@@ -66,34 +68,20 @@ class WorkflowsService:
         print(f"[WorkflowService] Executing workflow {workflow_id}...")
 
         try:
-            document = self.documents_service.get_documents_by_workflow(workflow_id)
-            if not document:
-                raise ValueError(f"No document found for workflow {workflow_id}")
-
-            if document.status == "processed":
-                print(f"[WorkflowService] Document {document.id} already processed.")
-                self.update_workflow(
-                    workflow_id=workflow_id,
-                    payload=WorkflowUpdate(status="completed"),
-                )
-                return {
-                    "message": "Document already processed",
-                    "document_id": document.id,
-                }
-
-            if document.status != "pending":
-                raise ValueError(
-                    f"Document {document.id} is in invalid state: {document.status}"
-                )
-
-            document_response = self.documents_service.process_and_store_document(
-                document_id=document.id,
-                embedding_model=workflow.definition.embeddingModel,
+            document_response = await self.documents_service.process_workflow_documents(
                 workflow_id=workflow_id,
+                embedding_model=workflow.definition.embeddingModel,
             )
+            if not document_response["documents"]:
+                raise ValueError(f"No document found for workflow {workflow_id}")
             print(
-                f"[WorkflowService] Document processed and stored: {document_response}"
+                f"[WorkflowService] Documents processed and stored: {document_response}"
             )
+            if document_response["failed"]:
+                # Processed documents are skipped when the job is retried
+                raise ValueError(
+                    f"{len(document_response['failed'])} document(s) failed to process"
+                )
             # Generate initial chat session and response
             new_session = self.chat_service.create_session(
                 payload=ChatSessionCreate(
@@ -122,4 +110,5 @@ class WorkflowsService:
                 workflow_id=workflow_id,
                 payload=WorkflowUpdate(status="failed"),
             )
-            return {"error": str(e)}
+            # Let the job queue record the error and retry
+            raise
@@ -0,0 +1,360 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# A job whose token expires within this many seconds is not started: it would fail part way through
+TOKEN_EXPIRY_LEEWAY = 60.0
+
+
+def token_expired(access_token: Optional[str], now: float) -> bool:
+    """
+    True if `access_token` is a JWT whose `exp` has passed (or is about to).
+    Missing or opaque tokens are left for the job handler to deal with.
+    """
+    if not access_token:
+        return False
+    try:
+        payload = access_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) <= now + TOKEN_EXPIRY_LEEWAY
+    except (IndexError, KeyError, TypeError, ValueError):
+        return False
+
+
+class JobQueue:
+    """
+    Durable job queue on a local SQLite file.
+
+    A claimed job is leased for `visibility_timeout` seconds; workers extend the
+    lease while they run. If a worker dies the lease expires and the job becomes
+    claimable again, which is also how jobs left running by a crashed process are
+    recovered on the next start. An expired lease counts as a failed attempt, so
+    a job that keeps killing its worker ends up FAILED like any other.
+
+    Jobs run with the access token of the user who enqueued them. A retry or
+    recovered job whose token has expired by the time it is claimed is failed
+    with an explicit error rather than run with a token that will be rejected.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 300.0, retry_backoff: float = 10.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    dedupe_key TEXT,
+                    payload TEXT NOT NULL,
+                    access_token TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_expires_at REAL,
+                    worker_id TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key, status)")
+            # Tokens are stored until the job finishes (every terminal state clears them), keep the files private
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.chmod(self.path + suffix, 0o600)
+                except OSError:
+                    pass
+        return self._db
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job.pop("access_token", None)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def enqueue(
+            self,
+            kind: str,
+            payload: Dict[str, Any],
+            access_token: Optional[str] = None,
+            dedupe_key: Optional[str] = None,
+            max_attempts: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Add a job. If `dedupe_key` matches a job that is still queued or running,
+        that job is returned instead of creating a second one.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if dedupe_key is not None:
+                    existing = db.execute(
+                        "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                        (dedupe_key, *ACTIVE_STATUSES),
+                    ).fetchone()
+                    if existing is not None:
+                        db.execute("COMMIT")
+                        return self._to_dict(existing)
+
+                job_id = str(uuid.uuid4())
+                db.execute(
+                    """
+                    INSERT INTO jobs (id, kind, dedupe_key, payload, access_token, status, max_attempts,
+                                      available_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (job_id, kind, dedupe_key, json.dumps(payload, default=str), access_token, QUEUED,
+                     max(1, max_attempts), now, now, now),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return self._to_dict(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    @staticmethod
+    def _finish_failed(db: sqlite3.Connection, job_id: str, error: str, now: float) -> None:
+        db.execute(
+            """
+            UPDATE jobs SET status = ?, error = ?, access_token = NULL, lease_expires_at = NULL, worker_id = NULL,
+                            finished_at = ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (FAILED, error, now, now, job_id),
+        )
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest runnable job: a queued job that is due, or a running job
+        whose lease has expired and has attempts left. Jobs that can't run (no
+        attempts left, expired access token) are marked FAILED on the way.
+        Returns the job including its access token.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = db.execute(
+                        """
+                        SELECT * FROM jobs
+                        WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?)
+                        ORDER BY available_at LIMIT 1
+                        """,
+                        (QUEUED, now, RUNNING, now),
+                    ).fetchone()
+                    if row is None:
+                        db.execute("COMMIT")
+                        return None
+                    if row["status"] == RUNNING:
+                        if row["attempts"] >= row["max_attempts"]:
+                            print(f"[JobQueue] Lease on job {row['id']} expired on its last attempt, failing it")
+                            self._finish_failed(
+                                db, row["id"],
+                                f"Worker stopped responding; gave up after {row['attempts']} attempt(s)", now,
+                            )
+                            continue
+                        print(f"[JobQueue] Lease on job {row['id']} expired (worker {row['worker_id']}), reclaiming")
+                    if token_expired(row["access_token"], now):
+                        self._finish_failed(
+                            db, row["id"], "Access token expired before the job could run; submit it again", now
+                        )
+                        continue
+                    break
+                db.execute(
+                    """
+                    UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, worker_id = ?,
+                                    started_at = COALESCE(started_at, ?), updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (RUNNING, now + self.visibility_timeout, worker_id, now, now, row["id"]),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            claimed = db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        job = self._to_dict(claimed)
+        job["access_token"] = claimed["access_token"]
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease. False if the job was reclaimed by another worker."""
+        now = time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + self.visibility_timeout, now, job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        """Record success. False if the worker no longer holds the job's lease."""
+        now = time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error = NULL, access_token = NULL,
+                                lease_expires_at = NULL, finished_at = ?, updated_at = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+                """,
+                (SUCCEEDED, json.dumps(result, default=str), now, now, job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Record a failed attempt; requeue with linear backoff until attempts run out.
+        Returns None, changing nothing, if the worker no longer holds the lease.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = ?",
+                (job_id, worker_id, RUNNING),
+            ).fetchone()
+            if row is None:
+                return None
+            if retry and row["attempts"] < row["max_attempts"]:
+                db.execute(
+                    """
+                    UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL,
+                                    worker_id = NULL, updated_at = ?
+                    WHERE id = ? AND worker_id = ?
+                    """,
+                    (QUEUED, error, now + self.retry_backoff * row["attempts"], now, job_id, worker_id),
+                )
+            else:
+                db.execute(
+                    """
+                    UPDATE jobs SET status = ?, error = ?, access_token = NULL, lease_expires_at = NULL,
+                                    finished_at = ?, updated_at = ?
+                    WHERE id = ? AND worker_id = ?
+                    """,
+                    (FAILED, error, now, now, job_id, worker_id),
+                )
+            return self._to_dict(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def release(self, job_id: str, worker_id: str) -> None:
+        """Hand a job back without counting the attempt, e.g. on graceful shutdown."""
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                """
+                UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), lease_expires_at = NULL,
+                                worker_id = NULL, available_at = ?, updated_at = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+                """,
+                (QUEUED, now, now, job_id, worker_id, RUNNING),
+            )
+
+    def recover(self) -> int:
+        """
+        Requeue running jobs whose lease has expired and that have attempts left;
+        fail the rest. Finished jobs never keep a token, so any left behind (e.g.
+        by an older build) are scrubbed. Returns how many were requeued.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                exhausted = db.execute(
+                    """
+                    UPDATE jobs SET status = ?, error = ?, access_token = NULL, lease_expires_at = NULL,
+                                    worker_id = NULL, finished_at = ?, updated_at = ?
+                    WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts
+                    """,
+                    (FAILED, "Worker stopped responding on the last attempt", now, now, RUNNING, now),
+                ).rowcount
+                requeued = db.execute(
+                    """
+                    UPDATE jobs SET status = ?, lease_expires_at = NULL, worker_id = NULL, available_at = ?,
+                                    updated_at = ?
+                    WHERE status = ? AND lease_expires_at < ?
+                    """,
+                    (QUEUED, now, now, RUNNING, now),
+                ).rowcount
+                db.execute(
+                    "UPDATE jobs SET access_token = NULL WHERE status IN (?, ?) AND access_token IS NOT NULL",
+                    (SUCCEEDED, FAILED),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if exhausted:
+            print(f"[JobQueue] Failed {exhausted} abandoned job(s) with no attempts left")
+        return requeued
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list_by_dedupe_key(self, dedupe_key: str, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ? ORDER BY created_at DESC LIMIT ?",
+                (dedupe_key, limit),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+job_queue = JobQueue(
+    settings.JOB_QUEUE_PATH,
+    visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+    retry_backoff=settings.JOB_RETRY_BACKOFF,
+)
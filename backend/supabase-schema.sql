@@ -48,11 +48,12 @@ create table if not exists public.document_chunks (
     workflow_id uuid references public.workflows (id) on delete cascade,
     chunk_index int not null,
     content text not null,
-    created_at timestamptz default timezone('utc'::text, now()),
-    constraint ux_documents_workflow unique (workflow_id) 
+    created_at timestamptz default timezone('utc'::text, now())
 );
-create unique index if not exists ux_documents_workflow
-  on public.documents (workflow_id);
+-- A workflow may have many documents; older deployments enforced one, either
+-- as a constraint on document_chunks or as a unique index on documents
+alter table public.document_chunks drop constraint if exists ux_documents_workflow;
+drop index if exists public.ux_documents_workflow;
 
 create index idx_chunks_document_id on public.document_chunks(document_id);
 create index idx_chunks_workflow_id on public.document_chunks(workflow_id);